@@ -0,0 +1,165 @@
+"""
+End-to-end benchmarks against the local Eos simulator.
+
+Starts benchmarks/eos_simulator.py in a separate process with a synthetic show,
+runs the MCP server in-process behind a fastmcp client, and reports:
+
+  * tool-call latency percentiles (fire-and-forget, state reads, round trips)
+  * inbound messages/sec handled and loss while the console streams levels
+  * show sync time for the synthetic show
+  * outbound loss (commands sent vs. commands the console received)
+
+    python benchmarks/bench_e2e.py --cues 5000 --channels 2000 --calls 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from fastmcp import Client
+import eos_server
+
+
+def start_simulator(args):
+    cmd = [
+        sys.executable, os.path.join(HERE, "eos_simulator.py"),
+        "--port", str(eos_server.EOS_PORT_TX), "--reply-port", str(eos_server.EOS_PORT_RX),
+        "--cues", str(args.cues), "--cue-lists", str(args.cue_lists),
+        "--channels", str(args.channels), "--groups", str(args.groups),
+        "--palettes", str(args.palettes), "--loss", str(args.loss),
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()  # wait for the "Simulated Eos on ..." banner
+    return proc
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    def pick(p):
+        return samples[min(int(p / 100 * len(samples)), len(samples) - 1)]
+    return {
+        "p50": pick(50), "p90": pick(90), "p99": pick(99),
+        "max": samples[-1], "mean": statistics.fmean(samples),
+    }
+
+
+async def bench_tool_latency(mcp, calls):
+    cases = [
+        ("command_line", {"command": "Chan 1 At 50#"}),
+        ("set_fader", {"bank": 1, "fader": 1, "level": 0.5}),
+        ("get_state", {"fields": ["active_cue", "command_line"]}),
+        ("get_state_delta", {"since_seq": 0}),
+        ("get_version", {}),
+        ("batch", {"operations": [{"op": "set_fader", "bank": 1, "fader": f, "level": 0.5}
+                                  for f in range(1, 11)]}),
+    ]
+    print(f"\nTool call latency ({calls} calls each, ms)")
+    print(f"  {'tool':<18}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}{'mean':>8}")
+    for name, arguments in cases:
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            await mcp.call_tool(name, arguments)
+            samples.append((time.perf_counter() - start) * 1000)
+        stats = percentiles(samples)
+        print(f"  {name:<18}" + "".join(f"{stats[k]:>8.2f}" for k in ("p50", "p90", "p99", "max", "mean")))
+
+
+async def bench_inbound(packets, rates, settle):
+    print(f"\nInbound stream ({packets} fader level messages per run)")
+    print(f"  {'rate':>8}{'handled':>10}{'msg/s':>10}{'loss':>8}")
+    for rate in rates:
+        before = eos_server.pool.default.events.seq
+        eos_server.send_message("/sim/stream", [packets, float(rate)])
+        start = time.perf_counter()
+        last_seq, last_change = before, start
+        while time.perf_counter() - last_change < settle:
+            await asyncio.sleep(0.01)
+            seq = eos_server.pool.default.events.seq
+            if seq != last_seq:
+                last_seq, last_change = seq, time.perf_counter()
+        handled = last_seq - before
+        elapsed = max(last_change - start, 1e-9)
+        label = "max" if not rate else str(rate)
+        print(f"  {label:>8}{handled:>10}{handled / elapsed:>10.0f}{max(1 - handled / packets, 0):>8.1%}")
+
+
+async def bench_sync(mcp):
+    print("\nShow sync")
+    start = time.perf_counter()
+    result = await mcp.call_tool("sync_show", {})
+    elapsed = time.perf_counter() - start
+    counts = eos_server.pool.default.show_cache.counts()
+    records = sum(counts.values())
+    print(f"  {records} records in {elapsed:.2f}s ({records / elapsed:.0f} records/s)")
+    print("  " + result.content[0].text.replace("\n", "\n  "))
+
+
+async def sim_stats():
+    _, args = await eos_server.query("/sim/stats", [], "/sim/out/stats")
+    return args[0]
+
+
+async def bench_outbound(commands, rate):
+    print(f"\nOutbound ({commands} commands at {rate or 'max'} msg/s)")
+    eos_server.send_message("/sim/reset", [])
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    for i in range(commands):
+        eos_server.send_message("/eos/cmd", f"Chan {i % 100 + 1} At 50#")
+        if i % 16 == 15:
+            ahead = start + (i + 1) / rate - time.perf_counter() if rate else 0
+            await asyncio.sleep(max(ahead, 0))
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.5)
+    received = await sim_stats() - 1  # the /sim/stats request itself
+    print(f"  sent in {elapsed:.3f}s ({commands / elapsed:.0f} msg/s), "
+          f"console received {received} ({max(1 - received / commands, 0):.1%} loss)")
+
+
+async def run(args):
+    async with Client(eos_server.mcp) as mcp:
+        # Connections open on the first tool call; open them before anything is measured
+        await eos_server.pool.start()
+        await bench_tool_latency(mcp, args.calls)
+        await bench_inbound(args.packets, args.rates, args.settle)
+        await bench_sync(mcp)
+        await bench_outbound(args.commands, args.command_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cues", type=int, default=2000)
+    parser.add_argument("--cue-lists", type=int, default=2)
+    parser.add_argument("--channels", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--palettes", type=int, default=50)
+    parser.add_argument("--loss", type=float, default=0.0, help="simulated reply loss probability")
+    parser.add_argument("--calls", type=int, default=200, help="calls per tool in the latency run")
+    parser.add_argument("--packets", type=int, default=20000, help="messages per inbound run")
+    parser.add_argument("--rates", type=int, nargs="+", default=[2000, 10000, 0],
+                        help="inbound stream rates in msg/s (0 = as fast as possible)")
+    parser.add_argument("--commands", type=int, default=5000)
+    parser.add_argument("--command-rate", type=int, default=5000, help="outbound msg/s (0 = as fast as possible)")
+    parser.add_argument("--settle", type=float, default=1.0)
+    args = parser.parse_args()
+
+    # The tools log every send; keep the log out of the report
+    eos_server.log.setLevel(logging.WARNING)
+    sim = start_simulator(args)
+    try:
+        asyncio.run(run(args))
+    finally:
+        sim.terminate()
+        sim.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Outbound OSC encode throughput.
+
+Compares python-osc's OscMessageBuilder with eos_server.build_message (cached
+MessageTemplates) for the messages the hot-path tools send, then times the
+full send path -- SimpleUDPClient.send_message against client.send of a
+build_message -- into a local UDP socket that discards what it receives.
+
+    python benchmarks/bench_encode.py --messages 200000
+"""
+import argparse
+import logging
+import os
+import socket
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from pythonosc import udp_client
+from pythonosc.osc_message_builder import OscMessageBuilder
+import eos_server
+
+CASES = [
+    ("key", "/eos/key/go_0", 1.0),
+    ("fader", "/eos/fader/1/2", 0.5),
+    ("command", "/eos/cmd", "Chan 1 At 50#"),
+    ("color", "/eos/color/hs", [120.0, 50.0]),
+]
+
+
+def python_osc(address, value):
+    builder = OscMessageBuilder(address=address)
+    for arg in value if isinstance(value, list) else [value]:
+        builder.add_arg(arg)
+    return builder.build()
+
+
+def per_second(fn, address, value, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(address, value)
+    return count / (time.perf_counter() - start)
+
+
+def report(name, baseline, ours):
+    print(f"  {name:<10}{baseline:>14,.0f}{ours:>14,.0f}{ours / baseline:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000, help="messages per case")
+    args = parser.parse_args()
+    eos_server.log.setLevel(logging.WARNING)
+
+    for _, address, value in CASES:
+        assert eos_server.build_message(address, value).dgram == python_osc(address, value).dgram
+
+    print(f"Encode ({args.messages} messages per case, messages/sec)")
+    print(f"  {'case':<10}{'python-osc':>14}{'template':>14}{'speedup':>10}")
+    for name, address, value in CASES:
+        report(name, per_second(python_osc, address, value, args.messages),
+               per_second(eos_server.build_message, address, value, args.messages))
+
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.setblocking(False)
+    client = udp_client.SimpleUDPClient("127.0.0.1", sink.getsockname()[1])
+
+    def send_template(address, value):
+        client.send(eos_server.build_message(address, value))
+
+    def drain():
+        try:
+            while True:
+                sink.recv(65536)
+        except BlockingIOError:
+            pass
+
+    print("\nEncode + send to a local UDP sink (messages/sec)")
+    print(f"  {'case':<10}{'send_message':>14}{'template':>14}{'speedup':>10}")
+    try:
+        for name, address, value in CASES:
+            baseline = per_second(client.send_message, address, value, args.messages)
+            drain()
+            ours = per_second(send_template, address, value, args.messages)
+            drain()
+            report(name, baseline, ours)
+    finally:
+        sink.close()
+
+
+if __name__ == "__main__":
+    main()
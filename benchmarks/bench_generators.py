@@ -0,0 +1,66 @@
+"""
+Generator engine frame budget.
+
+Runs generators over many channels into an offline console (sends are
+built and bundled, then dropped) and times each frame: waveform
+evaluation, diff against the previous frame, message encoding and bundle
+packing. Reports frame time against the budget at 30 and 44 frames/sec.
+
+    python benchmarks/bench_generators.py --channels 512 --generators 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import eos_server
+
+PARAMS = [("pan", "sine", 0.0, 540.0), ("tilt", "sine", 0.0, 270.0),
+          ("hue", "saw", 0.0, 360.0), ("intens", "chase", 0.0, 100.0)]
+
+
+def run(channels, generators, frames, frame_rate, rate):
+    console = eos_server.Console("bench", transport="offline")
+    # An unlimited outbound budget: this times frame work, not pacing
+    console.outbound = eos_server.OutboundScheduler(console.send_now, rate=1e9, burst=10 ** 6)
+    engine = eos_server.GeneratorEngine(console, frame_rate)
+    for i in range(generators):
+        param, waveform, low, high = PARAMS[i % len(PARAMS)]
+        addresses = [f"/eos/chan/{n}/param/{param}" for n in range(1, channels + 1)]
+        # Added directly: the engine task is not started, frames are driven below
+        engine.generators[i] = eos_server.Generator(i, waveform, param, addresses, rate, low, high, 1.0)
+    times = []
+    values = 0
+    for frame in range(frames):
+        start = time.perf_counter()
+        values += engine.tick(frame / frame_rate)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    budget = 1 / frame_rate
+    p50, p99 = times[len(times) // 2], times[min(int(len(times) * 0.99), len(times) - 1)]
+    print(f"  {frame_rate:>5.0f} fps  {channels * generators:>6} targets  "
+          f"values/frame {values / frames:>7.0f}  bundles/frame {engine.bundles / frames:>5.1f}  "
+          f"frame p50 {p50 * 1000:>6.2f} ms  p99 {p99 * 1000:>6.2f} ms  "
+          f"mean {statistics.fmean(times) * 1000:>6.2f} ms  ({p99 / budget:.0%} of {budget * 1000:.1f} ms budget)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, nargs="+", default=[64, 256, 512])
+    parser.add_argument("--generators", type=int, default=3)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=0.5, help="waveform cycles per second")
+    parser.add_argument("--frame-rates", type=float, nargs="+", default=[30.0, 44.0])
+    args = parser.parse_args()
+    print(f"Generator frames ({args.generators} generators, {args.frames} frames)")
+    for frame_rate in args.frame_rates:
+        for channels in args.channels:
+            run(channels, args.generators, args.frames, frame_rate, args.rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Compares the thread-per-packet OSC listener with the asyncio listener.
+
+A separate process streams /eos/out/fader/<bank>/<fader> level messages, the
+same traffic Eos produces during a fade, at the listener. For each listener
+this reports packets handled per second, loss, and process CPU time.
+
+    python benchmarks/bench_listener.py --packets 50000 --rate 20000
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pythonosc import osc_server
+import eos_server
+
+
+def blast(port, packets, rate):
+    """Sends fader level messages to the listener, paced to rate packets/sec (0 = unpaced)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    dgrams = [
+        eos_server.build_message(f"/eos/out/fader/{bank}/{fader}", 0.5).dgram
+        for bank in range(1, 5) for fader in range(1, 11)
+    ]
+    start = time.perf_counter()
+    for i in range(packets):
+        sock.sendto(dgrams[i % len(dgrams)], ("127.0.0.1", port))
+        if rate:
+            ahead = (i + 1) / rate - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+    sock.close()
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+        self.first = None
+        self.last = None
+
+    def __call__(self, *args):
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.count += 1
+
+
+def counting_router(counter):
+    def handle_and_count(bank, fader, *args):
+        eos_server.handle_fader_level(bank, fader, *args)
+        counter()
+
+    router = eos_server.build_router()
+    router.map("/eos/out/fader/<int:bank>/<int:fader>", handle_and_count)
+    return router
+
+
+def run_sender(port, packets, rate):
+    proc = multiprocessing.Process(target=blast, args=(port, packets, rate))
+    proc.start()
+    return proc
+
+
+def bench_threaded(port, packets, rate, settle):
+    counter = Counter()
+    server = osc_server.ThreadingOSCUDPServer(("127.0.0.1", port), counting_router(counter))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    cpu = time.process_time()
+    proc = run_sender(port, packets, rate)
+    proc.join()
+    time.sleep(settle)
+    cpu = time.process_time() - cpu
+
+    server.shutdown()
+    server.server_close()
+    return counter, cpu
+
+
+def bench_asyncio(port, packets, rate, settle):
+    counter = Counter()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        server = osc_server.AsyncIOOSCUDPServer(("127.0.0.1", port), counting_router(counter), loop)
+        transport, _ = await server.create_serve_endpoint()
+        cpu = time.process_time()
+        proc = run_sender(port, packets, rate)
+        while proc.is_alive():
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(settle)
+        cpu = time.process_time() - cpu
+        transport.close()
+        return cpu
+
+    cpu = asyncio.run(main())
+    return counter, cpu
+
+
+def report(name, counter, cpu, packets):
+    elapsed = (counter.last - counter.first) if counter.count > 1 else 0.0
+    rate = counter.count / elapsed if elapsed else 0.0
+    loss = 100.0 * (packets - counter.count) / packets
+    print(f"{name:<10} handled {counter.count:>8}/{packets}  loss {loss:5.1f}%  "
+          f"{rate:>10.0f} pkt/s  cpu {cpu:6.2f}s  ({1e6 * cpu / max(counter.count, 1):.1f} us/pkt)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--packets", type=int, default=50000)
+    parser.add_argument("--rate", type=int, default=20000, help="packets/sec, 0 for unpaced")
+    parser.add_argument("--port", type=int, default=19001)
+    parser.add_argument("--settle", type=float, default=0.5, help="seconds to drain after sending")
+    args = parser.parse_args()
+
+    counter, cpu = bench_threaded(args.port, args.packets, args.rate, args.settle)
+    report("threaded", counter, cpu, args.packets)
+    counter, cpu = bench_asyncio(args.port + 1, args.packets, args.rate, args.settle)
+    report("asyncio", counter, cpu, args.packets)
+
+
+if __name__ == "__main__":
+    main()
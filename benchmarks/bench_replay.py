@@ -0,0 +1,89 @@
+"""
+Capture replay throughput.
+
+Replays a capture file (written by the start_capture tool) through the
+inbound dispatch path into an offline console at several speeds and reports
+packets/sec and the state it rebuilt. Without a capture file, a synthetic
+one is written first: fader level streams with cue changes mixed in,
+recorded at --rate packets/sec.
+
+    python benchmarks/bench_replay.py --packets 200000 --speeds 1 10 0
+    python benchmarks/bench_replay.py show.eoscap --speeds 0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+import eos_server
+
+
+def osc(address, *values):
+    builder = OscMessageBuilder(address)
+    for value in values:
+        builder.add_arg(value)
+    return builder.build().dgram
+
+
+def write_synthetic_capture(path, packets, rate, banks, faders):
+    """Writes a capture of fader moves with a cue change every 100 packets."""
+    step_ns = int(1e9 / rate)
+    start = time.monotonic_ns()
+    with open(path, "wb") as f:
+        f.write(eos_server.CAPTURE_MAGIC)
+        for i in range(packets):
+            if i % 100 == 99:
+                cue = i // 100 % 500 + 1
+                data = osc(f"/eos/out/active/cue/1/{cue}", (i % 10) / 10)
+            else:
+                bank = i // faders % banks + 1
+                data = osc(f"/eos/out/fader/{bank}/{i % faders + 1}", (i % 101) / 100)
+            f.write(eos_server._CAPTURE_RECORD.pack(start + i * step_ns, len(data)))
+            f.write(data)
+
+
+async def bench(path, speeds):
+    recorded = [ts for ts, _ in eos_server.read_capture(path)]
+    duration = (recorded[-1] - recorded[0]) / 1e9 if len(recorded) > 1 else 0.0
+    print(f"Capture: {len(recorded)} packets, {os.path.getsize(path)} bytes, {duration:.2f}s recorded")
+    print(f"  {'speed':>8}{'seconds':>10}{'pkt/s':>12}{'state seq':>12}")
+    for speed in speeds:
+        console = eos_server.Console(f"replay-{speed}", transport="offline")
+        packets, seconds = await eos_server.replay_capture(path, eos_server.build_router(console), speed)
+        label = "max" if not speed else f"{speed:g}x"
+        print(f"  {label:>8}{seconds:>10.3f}{packets / max(seconds, 1e-9):>12.0f}{console.state.seq:>12}")
+    state = console.state.snapshot()
+    print(f"\nFinal state: cue {state.get('active_cue_list')}/{state.get('active_cue_number')}, "
+          f"{len(console.fader_banks.banks())} fader banks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", nargs="?", help="capture file to replay (default: synthesize one)")
+    parser.add_argument("--packets", type=int, default=100000, help="packets in the synthetic capture")
+    parser.add_argument("--rate", type=int, default=5000, help="recorded packets/sec of the synthetic capture")
+    parser.add_argument("--banks", type=int, default=4)
+    parser.add_argument("--faders", type=int, default=10)
+    parser.add_argument("--speeds", type=float, nargs="+", default=[10, 100, 0],
+                        help="replay speeds (1 = recorded timing, 0 = as fast as possible)")
+    args = parser.parse_args()
+
+    eos_server.log.setLevel(logging.WARNING)
+    if args.capture:
+        asyncio.run(bench(args.capture, args.speeds))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.eoscap")
+        write_synthetic_capture(path, args.packets, args.rate, args.banks, args.faders)
+        asyncio.run(bench(path, args.speeds))
+
+
+if __name__ == "__main__":
+    main()
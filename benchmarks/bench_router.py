@@ -0,0 +1,84 @@
+"""
+Microbenchmark of inbound OSC routing: the segment-trie Router against
+pythonosc's glob Dispatcher, on a mix of fader, cue and direct select traffic.
+
+Both sides call no-op handlers so only routing and parsing are measured;
+a last row runs the router with the real state handlers.
+
+    python benchmarks/bench_router.py --messages 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pythonosc import dispatcher
+import eos_server
+
+GLOB_PATTERNS = [
+    "/eos/out/active/cue/*/*", "/eos/out/active/cue/text",
+    "/eos/out/pending/cue/*/*", "/eos/out/pending/cue/text",
+    "/eos/out/event/state", "/eos/out/cmd", "/eos/out/user/*/cmd",
+    "/eos/out/active/chan", "/eos/out/wheel", "/eos/out/pantilt", "/eos/out/xyz",
+    "/eos/out/fader/*", "/eos/out/fader/*/*", "/eos/out/fader/*/*/name",
+    "/eos/out/ds/*", "/eos/out/ds/*/*",
+]
+
+
+def traffic():
+    dgrams = []
+    for bank in range(1, 5):
+        for fader in range(1, 11):
+            dgrams.append(eos_server.build_message(f"/eos/out/fader/{bank}/{fader}", 0.5).dgram)
+    for percent in range(0, 100, 5):
+        dgrams.append(eos_server.build_message("/eos/out/active/cue/1/5", percent / 100).dgram)
+    for button in range(1, 21):
+        dgrams.append(eos_server.build_message(f"/eos/out/ds/1/{button}", "Chan").dgram)
+    dgrams.append(eos_server.build_message("/eos/out/cmd", "LIVE: Cue 1 5 :").dgram)
+    return dgrams
+
+
+def noop(*args):
+    pass
+
+
+def glob_dispatcher():
+    disp = dispatcher.Dispatcher()
+    for pattern in GLOB_PATTERNS:
+        disp.map(pattern, noop)
+    disp.set_default_handler(noop)
+    return disp
+
+
+def noop_router():
+    router = eos_server.Router()
+    for pattern, _ in eos_server.build_router().routes:
+        router.map(pattern, noop)
+    router.set_default_handler(noop)
+    return router
+
+
+def run(name, target, dgrams, count):
+    n = len(dgrams)
+    start = time.perf_counter()
+    for i in range(count):
+        target.call_handlers_for_packet(dgrams[i % n], None)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<22} {count / elapsed:>12.0f} msg/s  {1e6 * elapsed / count:6.2f} us/msg")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    args = parser.parse_args()
+
+    dgrams = traffic()
+    run("glob dispatcher", glob_dispatcher(), dgrams, args.messages)
+    run("trie router", noop_router(), dgrams, args.messages)
+    run("trie router + state", eos_server.build_router(), dgrams, args.messages)
+
+
+if __name__ == "__main__":
+    main()
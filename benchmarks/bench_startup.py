@@ -0,0 +1,95 @@
+"""
+Startup time of the MCP server.
+
+Launches eos_server.py over stdio the way an MCP client does and times, from
+process spawn: the initialize handshake, the first tools/list, and the first
+tool call (which opens the console connections with EOS_CONNECT =
+"first_call"). Also times a bare import, checks that importing binds no
+port, and prints the server's own startup milestones from get_metrics.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(HERE, "..", "eos_server.py")
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
+
+
+def time_import():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import eos_server"], cwd=os.path.dirname(SERVER), check=True)
+    return time.perf_counter() - start
+
+
+def import_leaves_port_free():
+    """Imports the server in a subprocess and tries to bind its listener port from here."""
+    code = "import eos_server, sys; print(eos_server.EOS_PORT_RX); sys.stdout.flush(); sys.stdin.read()"
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=os.path.dirname(SERVER),
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(proc.stdout.readline())
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            try:
+                sock.bind(("0.0.0.0", port))
+                return True
+            except OSError:
+                return False
+    finally:
+        proc.stdin.close()
+        proc.wait()
+
+
+async def time_stdio_session():
+    """Returns ({phase: seconds since spawn}, server startup milestones)."""
+    start = time.perf_counter()
+    timings = {}
+    with open(os.devnull, "w") as stderr:
+        async with Client(PythonStdioTransport(SERVER, keep_alive=False, log_file=stderr)) as mcp:
+            timings["initialize"] = time.perf_counter() - start
+            await mcp.list_tools()
+            timings["list_tools"] = time.perf_counter() - start
+            await mcp.call_tool("list_consoles", {})
+            timings["first_tool"] = time.perf_counter() - start
+            result = await mcp.call_tool("get_metrics", {})
+            server = json.loads(result.content[0].text)["startup_s"]
+    return timings, server
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    print(f"  {name:<22}{statistics.median(samples) * 1000:>9.0f}{samples[0] * 1000:>9.0f}{samples[-1] * 1000:>9.0f}")
+
+
+async def run(args):
+    print(f"Import leaves the listener port free: {'yes' if import_leaves_port_free() else 'NO'}")
+    print(f"\nStartup ({args.runs} runs, ms)")
+    print(f"  {'phase':<22}{'median':>9}{'min':>9}{'max':>9}")
+    report("import", [time_import() for _ in range(args.runs)])
+    sessions = [await time_stdio_session() for _ in range(args.runs)]
+    for phase in ("initialize", "list_tools", "first_tool"):
+        report(f"spawn -> {phase}", [timings[phase] for timings, _ in sessions])
+    print("\nServer milestones (ms since import began, last run)")
+    for milestone, seconds in sessions[-1][1].items():
+        print(f"  {milestone:<22}{seconds * 1000:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
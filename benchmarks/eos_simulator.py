@@ -0,0 +1,348 @@
+"""
+A stand-in Eos console for testing and benchmarking without a real console.
+
+Listens for the /eos/... commands the MCP tools send, answers /eos/get/...
+queries from a synthetic show of configurable size, plays cue fades on Go,
+and can stream /eos/out/... traffic (fader levels) at a configurable rate.
+
+    python benchmarks/eos_simulator.py --cues 5000 --channels 2000 --stream-rate 500
+    python benchmarks/eos_simulator.py --tcp   # OSC 1.1 SLIP over TCP on port 3032
+
+Besides the Eos addresses it understands a few /sim/... control messages:
+    /sim/stream <count> <rate>   send <count> fader level messages at <rate>/sec
+    /sim/stats                   reply /sim/out/stats <received> <sent> <dropped>
+    /sim/reset                   zero the counters
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pythonosc import osc_message_builder
+from pythonosc.osc_packet import OscPacket, ParseError
+
+from eos_server import SlipDecoder, slip_encode
+
+WORDS = ("warm", "cool", "front", "back", "side", "wash", "special", "blue", "amber",
+         "red", "green", "sunset", "night", "dawn", "storm", "fire", "window", "stage")
+
+PALETTE_TARGETS = ("ip", "fp", "cp", "bp")
+
+
+def build(address, *args):
+    builder = osc_message_builder.OscMessageBuilder(address=address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram
+
+
+def uid(target, number):
+    return f"{abs(hash((target, number))) & 0xffffffff:08x}-0000-0000-0000-000000000000"
+
+
+class SyntheticShow:
+    """A show of the requested size, laid out as Eos reports it over OSC."""
+
+    def __init__(self, cue_lists, cues, channels, groups, palettes, presets, macros, subs, seed=1):
+        rng = random.Random(seed)
+
+        def label(prefix, n):
+            return f"{prefix} {n} {rng.choice(WORDS)} {rng.choice(WORDS)}"
+
+        self.records = {}
+        self.records["cuelist"] = [(str(n), label("List", n), []) for n in range(1, cue_lists + 1)]
+        per_list = max(cues // max(cue_lists, 1), 1) if cues else 0
+        for lst in range(1, cue_lists + 1):
+            self.records[f"cue/{lst}"] = [
+                (str(c), label("Cue", c), [round(rng.uniform(0, 10), 1), 0.0])
+                for c in range(1, per_list + 1)
+            ]
+        self.records["patch"] = [(str(c), f"Chan {c}", []) for c in range(1, channels + 1)]
+        self.channels = {}
+        for target, count in [("group", groups)] + [(t, palettes) for t in PALETTE_TARGETS]:
+            self.records[target] = []
+            for n in range(1, count + 1):
+                self.records[target].append((str(n), label(target.capitalize(), n), []))
+                if channels:
+                    first = rng.randint(1, channels)
+                    last = min(channels, first + rng.randint(0, 24))
+                    self.channels[(target, str(n))] = f"{first}-{last}" if last > first else str(first)
+        self.records["preset"] = [(str(n), label("Preset", n), []) for n in range(1, presets + 1)]
+        self.records["macro"] = [(str(n), label("Macro", n), []) for n in range(1, macros + 1)]
+        self.records["sub"] = [(str(n), label("Sub", n), []) for n in range(1, subs + 1)]
+        self.by_number = {
+            target: {rec[0]: i for i, rec in enumerate(recs)} for target, recs in self.records.items()
+        }
+
+    def count(self, target):
+        return len(self.records.get(target, ()))
+
+    def reply(self, target, index):
+        """Returns the datagrams Eos sends for record `index` of `target`."""
+        records = self.records.get(target)
+        if records is None or not 0 <= index < len(records):
+            return []
+        number, label, data = records[index]
+        count = len(records)
+        out_uid = uid(target, number)
+        if target.startswith("cue/"):
+            return [build(f"/eos/out/get/{target}/{number}/0/list/{index}/{count}",
+                          index, out_uid, label, *data)]
+        if target == "patch":
+            return [build(f"/eos/out/get/patch/{number}/1/list/{index}/{count}", index, out_uid, label)]
+        dgrams = [build(f"/eos/out/get/{target}/{number}/list/{index}/{count}", index, out_uid, label, *data)]
+        channels = self.channels.get((target, number))
+        if channels:
+            dgrams.append(build(f"/eos/out/get/{target}/{number}/channels/list/{index}/{count}",
+                                index, out_uid, channels))
+        return dgrams
+
+
+class EosSimulator:
+    def __init__(self, show, loss=0.0, fade_time=3.0, fade_rate=30.0):
+        self.show = show
+        self.loss = loss
+        self.fade_time = fade_time
+        self.fade_rate = fade_rate
+        self.received = 0
+        self.sent = 0
+        self.dropped = 0
+        self.command_line = ""
+        self.active = ("1", "1")
+        self._send = None
+        self._fade = None
+        self._tasks = set()
+
+    def attach(self, send):
+        self._send = send
+
+    def out(self, dgram, lossy=True):
+        if lossy and self.loss and random.random() < self.loss:
+            self.dropped += 1
+            return
+        self.sent += 1
+        self._send(dgram)
+
+    def spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def handle_packet(self, data):
+        try:
+            messages = OscPacket(data).messages
+        except ParseError:
+            return
+        for timed in messages:
+            self.received += 1
+            self.handle(timed.message.address, timed.message.params)
+
+    def handle(self, address, args):
+        parts = address.split("/")
+        if address.startswith("/sim/"):
+            self.handle_sim(parts[2], args)
+        elif address.startswith("/eos/get/"):
+            self.handle_get(parts[3:])
+        elif address == "/eos/cmd" or address == "/eos/newcmd":
+            if address == "/eos/newcmd":
+                self.command_line = ""
+            self.command_line += str(args[0]) if args else ""
+            self.out(build("/eos/out/cmd", f"LIVE: {self.command_line}"))
+            if self.command_line.endswith("#"):  # Enter executes and clears the line
+                self.command_line = ""
+        elif address == "/eos/key/go_0" and args and args[0] == 1.0:
+            lst, cue = self.active
+            cues = self.show.records.get(f"cue/{lst}", [])
+            numbers = [c[0] for c in cues]
+            nxt = numbers[(numbers.index(cue) + 1) % len(numbers)] if cue in numbers else "1"
+            self.start_fade(lst, nxt)
+        elif len(parts) == 6 and parts[2] == "cue" and parts[5] == "fire":
+            self.start_fade(parts[3], parts[4])
+        elif len(parts) == 5 and parts[2] == "fader" and parts[4] == "config":
+            bank = parts[3]
+            self.out(build(f"/eos/out/fader/{bank}", f"Bank {bank}"))
+            for fader in range(1, 11):
+                self.out(build(f"/eos/out/fader/{bank}/{fader}/name", f"Sub {fader}"))
+                self.out(build(f"/eos/out/fader/{bank}/{fader}", 0.0))
+        elif len(parts) == 5 and parts[2] == "ds" and parts[4] == "config":
+            bank = parts[3]
+            self.out(build(f"/eos/out/ds/{bank}", f"Groups {bank}"))
+            for button in range(1, 21):
+                self.out(build(f"/eos/out/ds/{bank}/{button}", f"Group {button}"))
+        elif len(parts) == 5 and parts[2] == "fader" and args:
+            self.out(build(f"/eos/out/fader/{parts[3]}/{parts[4]}", float(args[0])))
+        elif address == "/eos/chan" and args:
+            self.select_channel(int(args[0]))
+
+    def select_channel(self, channel):
+        """Reports the selection and its wheels, as Eos does when a channel is selected."""
+        level = channel % 101
+        self.out(build("/eos/out/active/chan", f"{channel} [{level}] Chan {channel} @ {level}"))
+        wheels = [("Intens", 1, float(level)), ("Pan", 2, float(channel % 360)),
+                  ("Tilt", 2, float(channel % 180)), ("Hue", 3, float(channel * 7 % 360)),
+                  ("Saturation", 3, float(channel % 100))]
+        for n, (name, category, value) in enumerate(wheels, 1):
+            self.out(build(f"/eos/out/active/wheel/{n}", f"{name} [{value:.0f}]", category, value))
+
+    def handle_get(self, parts):
+        target = parts[0] if parts else ""
+        if target == "version":
+            self.out(build("/eos/out/get/version", "3.2.0 (simulator)"))
+        elif target == "setup":
+            self.out(build("/eos/out/get/setup", "simulator"))
+        elif target == "cmd":
+            self.out(build("/eos/out/cmd", f"LIVE: {self.command_line}"))
+        elif parts[:2] == ["cue", "active"]:
+            lst, cue = self.active
+            self.out(build(f"/eos/out/active/cue/{lst}/{cue}", 1.0))
+        elif parts[:2] == ["cue", "pending"]:
+            lst, cue = self.active
+            self.out(build(f"/eos/out/pending/cue/{lst}/{int(cue) + 1}", 0.0))
+        elif len(parts) >= 2:
+            if parts[0] == "cue" and len(parts) >= 3:
+                target, rest = f"cue/{parts[1]}", parts[2:]
+            else:
+                target, rest = parts[0], parts[1:]
+            if rest == ["count"]:
+                self.out(build(f"/eos/out/get/{target}/count", self.show.count(target)))
+            elif len(rest) == 2 and rest[0] == "index":
+                for dgram in self.show.reply(target, int(rest[1])):
+                    self.out(dgram)
+            elif len(rest) == 1:
+                index = self.show.by_number.get(target, {}).get(rest[0])
+                if index is not None:
+                    for dgram in self.show.reply(target, index):
+                        self.out(dgram)
+
+    def handle_sim(self, command, args):
+        if command == "stream" and len(args) >= 2:
+            self.spawn(self.stream(int(args[0]), float(args[1])))
+        elif command == "stats":
+            self.out(build("/sim/out/stats", self.received, self.sent, self.dropped), lossy=False)
+        elif command == "reset":
+            self.received = self.sent = self.dropped = 0
+
+    def start_fade(self, lst, cue):
+        if self._fade is not None:
+            self._fade.cancel()
+        self.active = (lst, cue)
+        self._fade = asyncio.get_running_loop().create_task(self.fade(lst, cue))
+
+    async def fade(self, lst, cue):
+        records = self.show.records.get(f"cue/{lst}", [])
+        label = next((r[1] for r in records if r[0] == cue), f"Cue {cue}")
+        self.out(build("/eos/out/active/cue/text", f"{lst}/{cue} {label}"))
+        steps = max(int(self.fade_time * self.fade_rate), 1)
+        start = time.monotonic()
+        for step in range(1, steps + 1):
+            self.out(build(f"/eos/out/active/cue/{lst}/{cue}", step / steps))
+            await asyncio.sleep(max(start + step / self.fade_rate - time.monotonic(), 0))
+
+    async def stream(self, count, rate, banks=4):
+        """Streams fader level changes across `banks` banks of 10 faders."""
+        start = time.monotonic()
+        for i in range(count):
+            bank, fader = i // 10 % banks + 1, i % 10 + 1
+            self.out(build(f"/eos/out/fader/{bank}/{fader}", 0.5 + 0.5 * math.sin(i / 50)), lossy=False)
+            if rate and i % 16 == 15:
+                ahead = start + (i + 1) / rate - time.monotonic()
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+                else:
+                    await asyncio.sleep(0)
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, sim, reply_addr):
+        self.sim = sim
+        self.reply_addr = reply_addr
+
+    def connection_made(self, transport):
+        self.sim.attach(lambda dgram: transport.sendto(dgram, self.reply_addr))
+
+    def datagram_received(self, data, addr):
+        self.sim.handle_packet(data)
+
+
+async def serve_udp(sim, host, port, reply_host, reply_port):
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _UdpProtocol(sim, (reply_host, reply_port)), local_addr=(host, port))
+    return transport
+
+
+async def serve_tcp(sim, host, port):
+    async def handle(reader, writer):
+        sim.attach(lambda dgram: writer.write(slip_encode(dgram)))
+        decoder = SlipDecoder()
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            for packet in decoder.feed(data):
+                sim.handle_packet(packet)
+        writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for an Eos console.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="UDP port Eos receives on")
+    parser.add_argument("--reply-host", default="127.0.0.1")
+    parser.add_argument("--reply-port", type=int, default=9001, help="UDP port replies are sent to")
+    parser.add_argument("--tcp", action="store_true", help="serve OSC over TCP instead of UDP")
+    parser.add_argument("--tcp-port", type=int, default=3032)
+    parser.add_argument("--cue-lists", type=int, default=1)
+    parser.add_argument("--cues", type=int, default=500)
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--palettes", type=int, default=30, help="per palette type")
+    parser.add_argument("--presets", type=int, default=30)
+    parser.add_argument("--macros", type=int, default=20)
+    parser.add_argument("--subs", type=int, default=20)
+    parser.add_argument("--loss", type=float, default=0.0, help="probability of dropping a reply")
+    parser.add_argument("--fade-time", type=float, default=3.0)
+    parser.add_argument("--stream-rate", type=float, default=0.0,
+                        help="continuous fader level messages/sec (0 = off)")
+    return parser.parse_args(argv)
+
+
+async def run(args, ready=None):
+    show = SyntheticShow(args.cue_lists, args.cues, args.channels, args.groups,
+                         args.palettes, args.presets, args.macros, args.subs)
+    sim = EosSimulator(show, loss=args.loss, fade_time=args.fade_time)
+    if args.tcp:
+        server = await serve_tcp(sim, args.host, args.tcp_port)
+        print(f"Simulated Eos on tcp {args.host}:{args.tcp_port}", flush=True)
+    else:
+        server = await serve_udp(sim, args.host, args.port, args.reply_host, args.reply_port)
+        print(f"Simulated Eos on udp {args.host}:{args.port}, replying to "
+              f"{args.reply_host}:{args.reply_port}", flush=True)
+    if ready is not None:
+        ready.set()
+    try:
+        if args.stream_rate:
+            while True:
+                await sim.stream(int(args.stream_rate), args.stream_rate)
+        else:
+            await asyncio.Event().wait()
+    finally:
+        server.close()
+
+
+def main():
+    try:
+        asyncio.run(run(parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
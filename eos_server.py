@@ -1,445 +1,2774 @@
+import time
+# Taken before the imports below, which are most of the startup time (see Metrics.mark_startup)
+_import_started = time.perf_counter()
 
-from fastmcp import FastMCP
-from pythonosc import udp_client, dispatcher, osc_server
+from fastmcp import FastMCP, Context
+from fastmcp.server.middleware import Middleware
+from pythonosc import udp_client, osc_server, osc_message_builder, osc_message, osc_packet
+from contextlib import asynccontextmanager
+import array
+import asyncio
+import atexit
+import base64
+import binascii
+import bisect
+import collections
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import logging
+import logging.handlers
+import math
+import mmap
+import os
+import queue
+import struct
+import sys
 import threading
-import time
+from typing import Annotated
+from pydantic import Field
+
+@asynccontextmanager
+async def lifespan(server):
+    """
+    Owns every thread and socket, so importing the module opens none. The log
+    writer starts with the server; console connections start here or on the
+    first tool call (EOS_CONNECT) and run on the MCP server's event loop. On
+    shutdown running sequences are cancelled, and pending sends and log
+    records flushed.
+    """
+    start_logging()
+    metrics.mark_startup("serving")
+    if EOS_CONNECT == "startup":
+        await pool.start()
+    try:
+        yield {}
+    finally:
+        for sequence in _sequences.values():
+            sequence.cancel()
+        await pool.close()
+        stop_logging()
 
-mcp = FastMCP("ETC Nomad")
+mcp = FastMCP("ETC Nomad", lifespan=lifespan)
 
 EOS_IP = "127.0.0.1"
 EOS_PORT_TX = 8000
 EOS_PORT_RX = 9001
+# "udp" uses the ports above; "tcp" uses one SLIP-framed (OSC 1.1) connection to EOS_PORT_TCP
+EOS_TRANSPORT = "udp"
+EOS_PORT_TCP = 3032
 
-client = udp_client.SimpleUDPClient(EOS_IP, EOS_PORT_TX)
-
-eos_state = {
-    "active_cue_list": None,
-    "active_cue_number": None,
-    "active_cue_percent": 0.0,
-    "active_cue_text": "",
-    "pending_cue_list": None,
-    "pending_cue_number": None,
-    "pending_cue_text": "",
-    "live_blind_state": 1, 
-    "command_line": "",
-    "active_channels": "",
-    "faders": {},
-    "direct_selects": {},
-    "wheels": {},
-    "pantilt": [], 
-    "xyz": []
+# Named console connections, each with its own listener and state. The first
+# is the default for tools called without a console argument. "user" sends commands as
+# that Eos OSC user (/eos/user/<n>/...). Each connection needs its own port_rx.
+EOS_CONSOLES = {
+    "primary": {"host": EOS_IP, "port_tx": EOS_PORT_TX, "port_rx": EOS_PORT_RX, "transport": EOS_TRANSPORT},
+    # "backup": {"host": "10.101.100.102", "port_tx": 8000, "port_rx": 9002},
 }
+# When console listeners are bound: "startup", or "first_call" (the first tool
+# call or resource read) so initialize and tool listing never wait on sockets
+EOS_CONNECT = "first_call"
+
+# Log records go to stderr (stdout carries the MCP stdio transport), or to this file if set
+EOS_LOG_FILE = None
+EOS_LOG_LEVEL = "INFO"
+
+# Directory start_capture and replay read and write capture files in; tools
+# only take paths relative to it
+EOS_CAPTURE_DIR = os.environ.get("EOS_CAPTURE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "captures")
 
-def handle_active_cue(address, *args):
+log = logging.getLogger("eos_server")
+
+# Attributes every LogRecord has; anything else was passed in extra= and is logged as a field
+_LOG_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonLogFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, with extra= fields as keys."""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _LOG_RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Leave formatting to the listener thread; QueueHandler would format here, on the caller
+        return record
+
+def setup_logging(path=EOS_LOG_FILE, level=None):
     """
-    Handles /eos/out/active/cue/<list>/<cue> (float argument)
-    Example address: /eos/out/active/cue/1/5
+    Sends the eos_server logger through a queue to a background thread that
+    writes JSON lines, so logging never blocks a tool or the OSC listener on
+    I/O. level defaults to the logger's current level. Returns the
+    QueueListener; stop it to flush pending records.
+    """
+    handler = logging.FileHandler(path) if path else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonLogFormatter())
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler)
+    log.handlers[:] = [_DeferredQueueHandler(records)]
+    if level is not None:
+        log.setLevel(level)
+    log.propagate = False
+    listener.start()
+    return listener
+
+def log_sent(address, *args, **fields):
+    """
+    Logs an outbound command with its address and arguments as fields. While
+    a batch is being built the entry is kept until the batch is sent.
     """
-    parts = address.split('/')
-    if len(parts) >= 7:
-        list_num = parts[5]
-        cue_num = parts[6]
-        percent = args[0] if args else 0.0
+    if not log.isEnabledFor(logging.INFO):
+        return
+    pending = _pending_batch.get()
+    if pending is not None:
+        pending.logs.append((address, args, fields))
+    else:
+        log.info("Sent %s", address, extra=dict(fields, address=address, values=list(args)))
 
-        eos_state["active_cue_list"] = list_num
-        eos_state["active_cue_number"] = cue_num
-        eos_state["active_cue_percent"] = percent
+log.setLevel(EOS_LOG_LEVEL)
+# The running QueueListener, from start_logging()
+_log_listener = None
 
-def handle_active_cue_text(address, *args):
-    """Handles /eos/out/active/cue/text (string argument)"""
-    if args:
-        eos_state["active_cue_text"] = args[0]
+def start_logging():
+    """Starts the log writer thread if it is not running."""
+    global _log_listener
+    if _log_listener is None:
+        _log_listener = setup_logging()
 
-def handle_pending_cue(address, *args):
+def stop_logging():
     """
-    Handles /eos/out/pending/cue/<list>/<cue>
+    Writes out queued records and stops the log writer. Until it is started
+    again, warnings and errors go to logging's last-resort stderr handler.
     """
-    parts = address.split('/')
-    if len(parts) >= 7:
-        list_num = parts[5]
-        cue_num = parts[6]
-        
-        eos_state["pending_cue_list"] = list_num
-        eos_state["pending_cue_number"] = cue_num
+    global _log_listener
+    listener, _log_listener = _log_listener, None
+    if listener is not None:
+        log.handlers[:] = []
+        listener.stop()
 
-def handle_pending_cue_text(address, *args):
-    """Handles /eos/out/pending/cue/text (string argument)"""
-    if args:
-        eos_state["pending_cue_text"] = args[0]
+atexit.register(stop_logging)
 
-def handle_live_blind(address, *args):
-    """Handles /eos/out/event/state (0=Blind, 1=Live)"""
-    if args:
-        eos_state["live_blind_state"] = args[0]
+# Upper bounds, in seconds, of the latency histogram buckets: 1us doubling up to ~134s
+HISTOGRAM_BOUNDS = tuple(1e-6 * 2 ** i for i in range(28))
 
-def handle_command_line(address, *args):
-    """Handles /eos/out/cmd and /eos/out/user/<num>/cmd"""
-    if args:
-        eos_state["command_line"] = args[0]
+class Histogram:
+    """Latency histogram with fixed log2 buckets; percentiles are bucket upper bounds."""
+    __slots__ = ("buckets", "count", "total", "min", "max")
 
-def handle_active_chan(address, *args):
-    """Handles /eos/out/active/chan"""
-    if args:
-        eos_state["active_channels"] = args[0]
+    def __init__(self):
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
 
-def handle_fader_bank_label(address, *args):
-    """Handles /eos/out/fader/<index> (bank label)"""
-    parts = address.split('/')
-    if len(parts) >= 5:
-        bank = int(parts[4])
-        if bank not in eos_state["faders"]: eos_state["faders"][bank] = {"bank_label": "", "faders": {}}
-        if args: eos_state["faders"][bank]["bank_label"] = args[0]
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
 
-def handle_fader_level(address, *args):
-    """Handles /eos/out/fader/<index>/<fader> (level)"""
-    parts = address.split('/')
-    if len(parts) >= 6:
-        bank = int(parts[4])
-        fader = int(parts[5])
-        if bank not in eos_state["faders"]: eos_state["faders"][bank] = {"bank_label": "", "faders": {}}
-        if fader not in eos_state["faders"][bank]["faders"]: eos_state["faders"][bank]["faders"][fader] = {'level': 0.0, 'label': ''}
-        
-        if args and isinstance(args[0], float):
-             eos_state["faders"][bank]["faders"][fader]['level'] = args[0]
-
-def handle_fader_label(address, *args):
-    """Handles /eos/out/fader/<index>/<fader>/name"""
-    parts = address.split('/')
-    if len(parts) >= 7:
-        bank = int(parts[4])
-        fader = int(parts[5])
-        if bank not in eos_state["faders"]: eos_state["faders"][bank] = {"bank_label": "", "faders": {}}
-        if fader not in eos_state["faders"][bank]["faders"]: eos_state["faders"][bank]["faders"][fader] = {'level': 0.0, 'label': ''}
-        
-        if args:
-            eos_state["faders"][bank]["faders"][fader]['label'] = args[0]
-
-def handle_ds_bank_label(address, *args):
-    """Handles /eos/out/ds/<index>"""
-    parts = address.split('/')
-    if len(parts) >= 5:
-        bank = int(parts[4])
-        if bank not in eos_state["direct_selects"]: eos_state["direct_selects"][bank] = {"label": "", "buttons": {}}
-        if args: eos_state["direct_selects"][bank]["label"] = args[0]
+    def percentile(self, p):
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(HISTOGRAM_BOUNDS[i], self.max) if i < len(HISTOGRAM_BOUNDS) else self.max
+        return self.max
 
-def handle_ds_button_label(address, *args):
-    """Handles /eos/out/ds/<index>/<button>"""
-    parts = address.split('/')
-    if len(parts) >= 6:
-        bank = int(parts[4])
-        btn = int(parts[5])
-        if bank not in eos_state["direct_selects"]: eos_state["direct_selects"][bank] = {"label": "", "buttons": {}}
-        if args: eos_state["direct_selects"][bank]["buttons"][btn] = args[0]
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 4),
+            "min_ms": round(self.min * 1000, 4),
+            "p50_ms": round(self.percentile(50) * 1000, 4),
+            "p90_ms": round(self.percentile(90) * 1000, 4),
+            "p99_ms": round(self.percentile(99) * 1000, 4),
+            "max_ms": round(self.max * 1000, 4),
+        }
 
-def handle_wheel_mode(address, *args):
-    if args: eos_state["wheels"]["mode"] = args[0]
+class Metrics:
+    """
+    Counters and latency histograms for the hot paths: OSC packets and bytes
+    in each direction, tool call latency per tool, and handler time per
+    inbound address pattern. Updates take one short lock and allocate
+    nothing after a name is first seen.
+    """
 
-def handle_pantilt(address, *args):
-    eos_state["pantilt"] = list(args)
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = collections.Counter()
+        self._histograms = {}
+        self.started = time.time()
+        # Seconds from the start of the module import to each startup milestone
+        self.startup = {}
 
-def handle_xyz(address, *args):
-    eos_state["xyz"] = list(args)
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
 
-def default_handler(address, *args):
-    pass
+    def packet(self, direction, size):
+        """Counts one OSC packet of size bytes, direction "in" or "out"."""
+        packets, nbytes = self._PACKET_COUNTERS[direction]
+        with self._lock:
+            self._counters[packets] += 1
+            self._counters[nbytes] += size
 
-def start_osc_listener():
-    disp = dispatcher.Dispatcher()
-    
-    disp.map("/eos/out/active/cue/*/*", handle_active_cue)
-    disp.map("/eos/out/active/cue/text", handle_active_cue_text)
-    disp.map("/eos/out/pending/cue/*/*", handle_pending_cue)
-    disp.map("/eos/out/pending/cue/text", handle_pending_cue_text)
-    
-    disp.map("/eos/out/event/state", handle_live_blind)
-    disp.map("/eos/out/cmd", handle_command_line)
-    disp.map("/eos/out/user/*/cmd", handle_command_line)
-    disp.map("/eos/out/active/chan", handle_active_chan)
-    disp.map("/eos/out/wheel", handle_wheel_mode)
-    disp.map("/eos/out/pantilt", handle_pantilt)
-    disp.map("/eos/out/xyz", handle_xyz)
+    _PACKET_COUNTERS = {d: (f"osc_{d}_packets", f"osc_{d}_bytes") for d in ("in", "out")}
 
-    disp.map("/eos/out/fader/*", handle_fader_bank_label)
-    disp.map("/eos/out/fader/*/*", handle_fader_level)
-    disp.map("/eos/out/fader/*/*/name", handle_fader_label)
+    def observe(self, group, name, seconds):
+        """Adds a latency sample to histogram name in group (e.g. "tools", "set_fader")."""
+        key = (group, name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
 
-    disp.map("/eos/out/ds/*", handle_ds_bank_label)
-    disp.map("/eos/out/ds/*/*", handle_ds_button_label)
+    def mark_startup(self, milestone):
+        """Records the time since import began for a milestone, the first time it is reached."""
+        if milestone not in self.startup:
+            self.startup[milestone] = time.perf_counter() - _import_started
 
-    disp.set_default_handler(default_handler)
+    def snapshot(self):
+        with self._lock:
+            result = {
+                "uptime_s": round(time.time() - self.started, 3),
+                "startup_s": {k: round(v, 4) for k, v in self.startup.items()},
+                "counters": dict(self._counters),
+            }
+            for (group, name), histogram in sorted(self._histograms.items()):
+                result.setdefault(group, {})[name] = histogram.summary()
+            return result
 
-    server = osc_server.ThreadingOSCUDPServer(("0.0.0.0", EOS_PORT_RX), disp)
-    print(f"Serving OSC listener on port {EOS_PORT_RX}")
-    server.serve_forever()
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
 
-listener_thread = threading.Thread(target=start_osc_listener, daemon=True)
-listener_thread.start()
+metrics = Metrics()
 
-@mcp.tool()
-def command_line(command: str) -> str:
-    """Sends a command to the ETC Nomad command line.
-    
-    Args:
-        command: The command string (e.g., "Chan 1 At 50").
-    """
-    address = "/eos/cmd"
-    client.send_message(address, command)
-    print(f"Sent: {address} '{command}'")
-    return f"Sent command: {command}"
+class ToolMetricsMiddleware(Middleware):
+    """Records the latency of every tool call, failed or not, under metrics["tools"]."""
 
-@mcp.tool()
-def set_level(value: float) -> str:
-    """Sets the level of the currently selected channels (0-100)."""
-    address = "/eos/at"
-    client.send_message(address, value)
-    print(f"Sent: {address} {value}")
-    return f"Set level to {value}"
+    async def on_call_tool(self, context, call_next):
+        start = time.perf_counter()
+        try:
+            return await call_next(context)
+        finally:
+            metrics.observe("tools", context.message.name, time.perf_counter() - start)
+            metrics.mark_startup("first_tool_response")
 
-@mcp.tool()
-def set_level_mod(modification: str) -> str:
-    """Sets level variants.
-    
-    Args:
-        modification: "out", "home", "remdim", "level", "full", "min", "max", "+%", "-%".
-    """
-    address = f"/eos/at/{modification}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
-    return f"Set level modification: {modification}"
+class ConnectMiddleware(Middleware):
+    """Starts the console connections before the first tool call or resource read."""
 
-@mcp.tool()
-def set_channel_mod(channel: int, modification: str) -> str:
-    """Sets level variants for a specific channel.
-    
-    Args:
-        channel: Channel number.
-        modification: "out", "home", "remdim", "level", "full", "min", "max", "+%", "-%".
+    async def on_call_tool(self, context, call_next):
+        if not pool.started:
+            await pool.start()
+        return await call_next(context)
+
+    on_read_resource = on_call_tool
+
+mcp.add_middleware(ToolMetricsMiddleware())
+mcp.add_middleware(ConnectMiddleware())
+
+SLIP_END = b"\xc0"
+SLIP_ESC = b"\xdb"
+SLIP_ESC_END = b"\xdb\xdc"
+SLIP_ESC_ESC = b"\xdb\xdd"
+
+def slip_encode(packet):
+    """Frames a packet with SLIP (RFC 1055), with an END byte on both sides as OSC 1.1 recommends."""
+    return SLIP_END + packet.replace(SLIP_ESC, SLIP_ESC_ESC).replace(SLIP_END, SLIP_ESC_END) + SLIP_END
+
+class SlipDecoder:
+    """Splits a SLIP byte stream into packets, carrying partial frames between reads."""
+
+    def __init__(self):
+        self._partial = b""
+
+    def feed(self, data):
+        frames = (self._partial + data).split(SLIP_END)
+        self._partial = frames.pop()
+        return [frame.replace(SLIP_ESC_END, SLIP_END).replace(SLIP_ESC_ESC, SLIP_ESC)
+                for frame in frames if frame]
+
+# Reconnect backoff bounds and the most bytes buffered while disconnected
+TCP_RECONNECT_MIN = 0.5
+TCP_RECONNECT_MAX = 5.0
+TCP_MAX_BUFFER = 1 << 20
+# Messages queued while disconnected are dropped on reconnect once they are
+# this old rather than delivered late: a key press should not fire a cue
+# seconds after it was reported sent. Long enough for sends made while the
+# connection is being opened to survive one retry at the minimum backoff.
+TCP_MAX_BUFFER_AGE = 2 * TCP_RECONNECT_MIN
+
+class TcpOscClient:
     """
-    address = f"/eos/chan/{channel}/{modification}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
-    return f"Set Channel {channel} mod: {modification}"
+    OSC over a single persistent TCP connection with SLIP framing.
 
-@mcp.tool()
-def set_group_mod(group: int, modification: str) -> str:
-    """Sets level variants for a specific group.
-    
-    Args:
-        group: Group number.
-        modification: "out", "home", "remdim", "level", "full", "min", "max", "+%", "-%".
+    Has the same send_message/send interface as SimpleUDPClient. Sends from
+    any thread are appended to a write buffer that a writer task drains,
+    so a burst of messages goes out in as few writes as possible. Inbound
+    packets go through the same router as the UDP listener. If the
+    connection drops it is re-established with backoff and on_reconnect is
+    scheduled to resync state. Messages buffered for longer than
+    TCP_MAX_BUFFER_AGE while disconnected are dropped and counted in
+    dropped_bytes instead of being sent on reconnect.
     """
-    address = f"/eos/group/{group}/{modification}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
-    return f"Set Group {group} mod: {modification}"
 
-@mcp.tool()
-def set_parameter(param: str, value: float) -> str:
-    """Sets a specific parameter to a value.
-    
-    Args:
-        param: Parameter name (e.g., "pan", "tilt", "zoom").
-        value: Value to set.
+    def __init__(self, host, port, on_reconnect=None):
+        self.host = host
+        self.port = port
+        self.on_reconnect = on_reconnect
+        self.connected = False
+        self.dropped_bytes = 0
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        # (time queued, offset in _buffer) of each message queued while disconnected
+        # and of the first message after the buffer was drained
+        self._queued = []
+        self._loop = None
+        self._wake = None
+        self._task = None
+
+    def send_message(self, address, value):
+        self.send(build_message(address, value))
+
+    def send(self, content):
+        frame = slip_encode(content.dgram)
+        with self._lock:
+            if len(self._buffer) + len(frame) > TCP_MAX_BUFFER:
+                self.dropped_bytes += len(frame)
+                return
+            first = not self._buffer
+            if first or not self.connected:
+                self._queued.append((time.monotonic(), len(self._buffer)))
+            self._buffer += frame
+        if first and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def start(self, router):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        if self._buffer:
+            self._wake.set()
+        self._task = self._loop.create_task(self._run(router))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._loop = None
+
+    async def _run(self, router):
+        delay = TCP_RECONNECT_MIN
+        reconnecting = False
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, TCP_RECONNECT_MAX)
+                continue
+            log.info("Connected to Eos over TCP", extra={"host": self.host, "port": self.port})
+            self._drop_stale()
+            self.connected = True
+            delay = TCP_RECONNECT_MIN
+            if reconnecting and self.on_reconnect is not None:
+                spawn(self.on_reconnect())
+            reconnecting = True
+            writer_task = asyncio.ensure_future(self._write(writer))
+            try:
+                await self._read(reader, router)
+            except OSError:
+                pass
+            finally:
+                self.connected = False
+                writer_task.cancel()
+                writer.close()
+            log.warning("Lost TCP connection to Eos, reconnecting")
+
+    def _drop_stale(self):
+        """Drops the buffered messages queued more than TCP_MAX_BUFFER_AGE ago."""
+        cutoff = time.monotonic() - TCP_MAX_BUFFER_AGE
+        with self._lock:
+            fresh = next((i for i, (queued, _) in enumerate(self._queued) if queued > cutoff), len(self._queued))
+            if not fresh:
+                return
+            dropped = self._queued[fresh][1] if fresh < len(self._queued) else len(self._buffer)
+            del self._buffer[:dropped]
+            self._queued = [(queued, offset - dropped) for queued, offset in self._queued[fresh:]]
+            self.dropped_bytes += dropped
+        log.warning("Dropped messages queued while disconnected from Eos", extra={"bytes": dropped})
+
+    async def _read(self, reader, router):
+        decoder = SlipDecoder()
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            for packet in decoder.feed(data):
+                router.call_handlers_for_packet(packet, None)
+
+    async def _write(self, writer):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                self._queued.clear()
+            if data:
+                writer.write(data)
+                await writer.drain()
+
+# 1500-byte Ethernet MTU minus the IPv4 and UDP headers
+OSC_MAX_DATAGRAM = 1472
+# "#bundle\0" followed by the "immediately" time tag: bundles are sent as soon
+# as they are built, so none is scheduled against the console's clock
+OSC_BUNDLE_HEADER = b"#bundle\x00" + struct.pack(">Q", 1)
+
+class PendingBatch:
     """
-    address = f"/eos/param/{param}"
-    client.send_message(address, value)
-    print(f"Sent: {address} {value}")
-    return f"Set {param} to {value}"
+    What tool calls produce while a batch is being built: their messages,
+    and the log entries and bookkeeping that must wait until the messages
+    are actually sent.
+    """
+    __slots__ = ("messages", "logs", "effects")
 
-@mcp.tool()
-def set_parameter_mod(param: str, modification: str) -> str:
-    """Sets parameter variants.
-    
-    Args:
-        param: Parameter name.
-        modification: "out", "home", "level", "full", "min", "max", "+%", "-%".
+    def __init__(self):
+        self.messages = []
+        self.logs = []
+        self.effects = []
+
+    def sent(self, logged=True):
+        """Applies the deferred effects once the messages have gone out, and logs them unless logged is False."""
+        for effect in self.effects:
+            effect()
+        if logged:
+            for address, args, fields in self.logs:
+                log_sent(address, *args, **fields)
+
+# Set by the batch tool so that tool calls queue their messages instead of sending them
+_pending_batch = contextvars.ContextVar("_pending_batch", default=None)
+
+def after_send(fn, *args):
+    """Calls fn(*args) now, or once the batch being built is sent."""
+    pending = _pending_batch.get()
+    if pending is None:
+        fn(*args)
+    else:
+        pending.effects.append(functools.partial(fn, *args))
+
+_pack_float = struct.Struct(">f").pack
+_pack_int = struct.Struct(">i").pack
+
+def _osc_string(data):
+    """Null-terminates and pads encoded string bytes to a multiple of 4."""
+    return data + b"\x00" * (4 - len(data) % 4)
+
+class EncodedPacket:
+    """An OSC packet encoded here rather than by python-osc; has the dgram and size clients send."""
+    __slots__ = ("dgram", "size")
+
+    def __init__(self, dgram):
+        self.dgram = dgram
+        self.size = len(dgram)
+
+class EncodedMessage(EncodedPacket):
+    """An encoded OSC message, with the address and params an OscMessage would have."""
+    __slots__ = ("address", "params")
+
+    def __init__(self, dgram, address, params):
+        super().__init__(dgram)
+        self.address = address
+        self.params = params
+
+# OSC type tags of the argument types that templates encode; anything else
+# (bools, bytes, nested lists, None inside a list) goes through python-osc
+_TEMPLATE_TAGS = {float: "f", int: "i", str: "s"}
+MESSAGE_TEMPLATE_CACHE_SIZE = 4096
+
+class MessageTemplate:
     """
-    address = f"/eos/param/{param}/{modification}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
-    return f"Set {param} modification: {modification}"
+    The encoded address and type tag string shared by every message to one
+    address with one argument signature. Messages with only float and int
+    arguments are the prefix plus one struct pack; strings are encoded
+    and padded per message.
+    """
+    __slots__ = ("prefix", "_pack", "_packers")
 
-@mcp.tool()
-def set_dmx(address_num: int, value: int) -> str:
-    """Sets a DMX address to a level (0-255)."""
-    address = f"/eos/addr/{address_num}/DMX"
-    client.send_message(address, value)
-    print(f"Sent: {address} {value}")
-    return f"Set DMX address {address_num} to {value}"
+    def __init__(self, address, tags):
+        self.prefix = _osc_string(address.encode()) + _osc_string(("," + tags).encode())
+        if "s" in tags:
+            self._pack = None
+            self._packers = [_osc_string_arg if tag == "s" else struct.Struct(">" + tag).pack for tag in tags]
+        else:
+            self._pack = struct.Struct(">" + tags).pack
 
-@mcp.tool()
-def wheel_level(ticks: float) -> str:
-    """Adjusts the level wheel.
-    
-    Args:
-        ticks: Number of ticks (positive/negative). e.g. 1.0, -1.0.
+    def encode(self, args):
+        """Returns the message's bytes. Raises struct.error for an int that does not fit in 32 bits."""
+        if self._pack is not None:
+            return self.prefix + self._pack(*args)
+        return self.prefix + b"".join([pack(arg) for pack, arg in zip(self._packers, args)])
+
+def _osc_string_arg(value):
+    return _osc_string(value.encode())
+
+# (address, argument types) -> MessageTemplate, or None if those types need python-osc
+_templates = {}
+
+def _template(key):
+    address, types = key
+    tags = "".join(_TEMPLATE_TAGS.get(t, "?") for t in types)
+    template = None if "?" in tags else MessageTemplate(address, tags)
+    if len(_templates) >= MESSAGE_TEMPLATE_CACHE_SIZE:
+        # Addresses that carry data (channel numbers, DMX addresses) could grow it without bound
+        _templates.clear()
+    _templates[key] = template
+    return template
+
+def build_message(address, value):
     """
-    address = "/eos/wheel/level"
-    client.send_message(address, ticks)
-    print(f"Sent: {address} {ticks}")
-    return f"Adjusted Level Wheel by {ticks}"
+    Encodes a message the same way SimpleUDPClient.send_message does. value
+    is None, one argument, or a list or tuple of them. Messages of float,
+    int and string arguments are encoded from a cached MessageTemplate;
+    others are built by python-osc.
+    """
+    if value is None:
+        args = ()
+    elif isinstance(value, (list, tuple)):
+        args = tuple(value)
+    else:
+        args = (value,)
+    key = (address, tuple(map(type, args)))
+    template = _templates.get(key, False)
+    if template is False:
+        template = _template(key)
+    if template is not None:
+        try:
+            return EncodedMessage(template.encode(args), address, list(args))
+        except struct.error:
+            pass
+    builder = osc_message_builder.OscMessageBuilder(address=address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build()
 
-@mcp.tool()
-def wheel_parameter(param: str, ticks: float) -> str:
-    """Adjusts a parameter wheel.
-    
-    Args:
-        param: Parameter name (e.g. "pan").
-        ticks: Number of ticks.
+def osc_element_head(address, tag="f"):
     """
-    address = f"/eos/wheel/{param}"
-    client.send_message(address, ticks)
-    print(f"Sent: {address} {ticks}")
-    return f"Adjusted {param} Wheel by {ticks}"
+    Pre-encodes everything of a one-argument message to address except the
+    4-byte value, as a bundle element: size, padded address and type tag
+    ("f" for a float, "i" for an int).
+    """
+    body = MessageTemplate(address, tag).prefix
+    return struct.pack(">i", len(body) + 4) + body
 
-@mcp.tool()
-def switch_parameter(param: str, ticks: float) -> str:
-    """Sets switch mode for repeats.
-    
-    Args:
-        param: Parameter name.
-        ticks: Tick rate.
+def pack_bundles(elements, max_size=OSC_MAX_DATAGRAM):
     """
-    address = f"/eos/switch/{param}"
-    client.send_message(address, ticks)
-    print(f"Sent: {address} {ticks}")
-    return f"Set Switch {param} to {ticks}"
+    Packs bundle elements, in order, into as few EncodedPacket bundles as
+    possible without any bundle exceeding max_size bytes. Each element is a
+    (head, tail) pair of bytes that together make one size-prefixed
+    message: an osc_element_head and a packed value, or a built message's
+    packed size and dgram. An element too large to share a bundle is sent
+    in a bundle of its own.
+    """
+    packets = []
+    parts = [OSC_BUNDLE_HEADER]
+    size = len(OSC_BUNDLE_HEADER)
+    for head, tail in elements:
+        n = len(head) + len(tail)
+        if size + n > max_size and len(parts) > 1:
+            packets.append(EncodedPacket(b"".join(parts)))
+            parts = [OSC_BUNDLE_HEADER]
+            size = len(OSC_BUNDLE_HEADER)
+        parts.append(head)
+        parts.append(tail)
+        size += n
+    if len(parts) > 1:
+        packets.append(EncodedPacket(b"".join(parts)))
+    return packets
 
-@mcp.tool()
-def set_xyz(x: float, y: float, z: float) -> str:
-    """Sets XYZ position."""
-    address = "/eos/xyz"
-    client.send_message(address, [x, y, z])
-    print(f"Sent: {address} {x}, {y}, {z}")
-    return f"Set XYZ to {x}, {y}, {z}"
+def transmit(content):
+    """Sends a built message or bundle to the current console."""
+    current().transmit(content)
 
-@mcp.tool()
-def set_color_hs(hue: float, saturation: float) -> str:
-    """Sets color using Hue (0-360) and Saturation (0-100)."""
-    address = "/eos/color/hs"
-    client.send_message(address, [hue, saturation])
-    print(f"Sent: {address} {hue}, {saturation}")
-    return f"Set Color HS: {hue}, {saturation}"
+def send_message(address, value):
+    """Sends an OSC message to the current console, or queues it if a batch is being built."""
+    console = current()
+    pending = _pending_batch.get()
+    if pending is not None:
+        pending.messages.append(build_message(console.command_address(address), value))
+    else:
+        console.outbound.flush_ahead()
+        console.send_now(address, value)
+        console.outbound.charge()
 
-@mcp.tool()
-def set_color_rgb(red: float, green: float, blue: float) -> str:
-    """Sets color using RGB values (0.0-1.0)."""
-    address = "/eos/color/rgb"
-    client.send_message(address, [red, green, blue])
-    print(f"Sent: {address} {red}, {green}, {blue}")
-    return f"Set Color RGB: {red}, {green}, {blue}"
+# Outbound pacing for continuous controls (faders, wheels, pan/tilt, xyz)
+OUTBOUND_FRAME = 0.02  # seconds over which updates to one address are merged
+OUTBOUND_RATE = 200.0  # packets/sec sustained
+OUTBOUND_BURST = 50  # packets that may be sent back to back
+OUTBOUND_MAX_PENDING = 1024  # distinct addresses waiting to be sent
 
-@mcp.tool()
-def set_color_xy(x: float, y: float) -> str:
-    """Sets color using CIE xy coordinates (0.0-1.0)."""
-    address = "/eos/color/xy"
-    client.send_message(address, [x, y])
-    print(f"Sent: {address} {x}, {y}")
-    return f"Set Color XY: {x}, {y}"
+class OutboundScheduler:
+    """
+    Paces continuous-control updates to the console. Updates to the same
+    address within a frame window are merged (absolute values are
+    last-write-wins, wheel ticks are summed), and flushes are limited by a
+    token bucket so a burst of calls cannot flood Eos's OSC input. Other
+    sends are charged to the same bucket so paced traffic backs off around
+    them, and call flush_ahead() first so they cannot overtake an update
+    submitted before them (pan/tilt for one selection arriving after the
+    command that selects the next).
 
-@mcp.tool()
-def set_pan_tilt(pan: float, tilt: float) -> str:
-    """Sets Pan and Tilt (0.0-1.0 range usually maps to max range)."""
-    address = "/eos/pantilt/xy"
-    client.send_message(address, [pan, tilt])
-    print(f"Sent: {address} {pan}, {tilt}")
-    return f"Set Pan/Tilt to {pan}, {tilt}"
+    Tools submit from worker threads; flushes run on the loop passed to
+    attach(). Without a loop, submissions are sent immediately.
+    """
 
-@mcp.tool()
-def select_channel(channel: str) -> str:
-    """Selects a channel number (or range string)."""
-    address = "/eos/chan"
-    try:
-        val = int(channel)
-        client.send_message(address, val)
-    except ValueError:
-        return f"Invalid channel number: {channel}. Use command_line for ranges."
-    print(f"Sent: {address} {channel}")
-    return f"Selected Channel {channel}"
+    def __init__(self, send, frame=OUTBOUND_FRAME, rate=OUTBOUND_RATE,
+                 burst=OUTBOUND_BURST, max_pending=OUTBOUND_MAX_PENDING):
+        self._send = send
+        self.frame = frame
+        self.rate = rate
+        self.burst = burst
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        # Held from taking updates until they are sent, so flush_ahead waits for a flush in progress
+        self._send_lock = threading.RLock()
+        self._pending = {}
+        self._loop = None
+        self._flush_scheduled = False
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self.counters = {"submitted": 0, "coalesced": 0, "sent": 0, "dropped": 0}
 
-@mcp.tool()
-def select_group(group: int) -> str:
-    """Selects a group."""
-    address = "/eos/group"
-    client.send_message(address, group)
-    print(f"Sent: {address} {group}")
-    return f"Selected Group {group}"
+    def attach(self, loop):
+        self._loop = loop
 
-@mcp.tool()
-def select_address_target(address_num: int) -> str:
-    """Selects an address (as a target)."""
-    address = "/eos/addr"
-    client.send_message(address, address_num)
-    print(f"Sent: {address} {address_num}")
-    return f"Selected Address {address_num}"
+    def submit(self, address, value, additive=False):
+        """Queues an update. Returns False if it was dropped because max_pending addresses are waiting."""
+        with self._lock:
+            self.counters["submitted"] += 1
+            entry = self._pending.get(address)
+            if entry is not None:
+                self.counters["coalesced"] += 1
+                entry[0] = entry[0] + value if additive else value
+                return True
+            if len(self._pending) >= self.max_pending:
+                self.counters["dropped"] += 1
+                return False
+            self._pending[address] = [value]
+            schedule = not self._flush_scheduled
+            self._flush_scheduled = True
+        loop = self._loop
+        if loop is None:
+            self.flush(limited=False)
+        elif schedule:
+            loop.call_soon_threadsafe(loop.call_later, self.frame, self.flush)
+        return True
 
-@mcp.tool()
-def select_curve(curve: int) -> str:
-    """Selects a curve."""
-    address = "/eos/curve"
-    client.send_message(address, curve)
-    print(f"Sent: {address} {curve}")
-    return f"Selected Curve {curve}"
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
 
-@mcp.tool()
-def select_effect(effect: int) -> str:
-    """Selects an effect."""
-    address = "/eos/fx"
-    client.send_message(address, effect)
-    print(f"Sent: {address} {effect}")
-    return f"Selected Effect {effect}"
+    def charge(self, count=1):
+        """Charges the bucket for packets sent outside the scheduler."""
+        with self._lock:
+            self._refill()
+            self._tokens = max(self._tokens - count, -self.burst)
 
-@mcp.tool()
-def select_pixel_map(pixmap: int) -> str:
-    """Selects a Pixel Map."""
-    address = "/eos/pixmap"
-    client.send_message(address, pixmap)
-    print(f"Sent: {address} {pixmap}")
-    return f"Selected Pixel Map {pixmap}"
+    def available(self):
+        """Returns how many whole packets the bucket allows right now."""
+        with self._lock:
+            self._refill()
+            return max(int(self._tokens), 0)
 
-@mcp.tool()
-def open_magic_sheet(ms: int) -> str:
-    """Opens a Magic Sheet."""
-    address = "/eos/ms"
-    client.send_message(address, ms)
-    print(f"Sent: {address} {ms}")
-    return f"Opened Magic Sheet {ms}"
+    def flush(self, limited=True):
+        """Sends as many pending updates as the bucket allows, oldest first."""
+        ready = []
+        with self._send_lock:
+            with self._lock:
+                self._refill()
+                while self._pending and (not limited or self._tokens >= 1):
+                    address = next(iter(self._pending))
+                    ready.append((address, self._pending.pop(address)[0]))
+                    self._tokens = max(self._tokens - 1, -self.burst)
+                self.counters["sent"] += len(ready)
+                self._flush_scheduled = bool(self._pending)
+                delay = max(self.frame, (1 - self._tokens) / self.rate)
+            logged = log.isEnabledFor(logging.INFO)
+            for address, value in ready:
+                self._send(address, value)
+                if logged:
+                    log.info("Sent %s", address, extra={"address": address,
+                                                        "values": value if isinstance(value, list) else [value]})
+        if self._flush_scheduled and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.call_later, delay, self.flush)
 
-@mcp.tool()
-def press_key(key_name: str) -> str:
-    """Presses and releases a hardkey (e.g., "Data", "About", "Go_To_Cue")."""
-    address = f"/eos/key/{key_name}"
-    client.send_message(address, 1.0)
-    client.send_message(address, 0.0)
-    print(f"Sent Key Press: {key_name}")
-    return f"Pressed key {key_name}"
+    def flush_ahead(self):
+        """Sends every pending update now, ahead of an unpaced send."""
+        with self._send_lock:
+            if self._pending:
+                self.flush(limited=False)
 
-@mcp.tool()
-def fire_macro(macro: int) -> str:
-    """Fires a macro."""
-    address = "/eos/macro/fire"
-    client.send_message(address, macro)
-    print(f"Sent: {address} {macro}")
-    return f"Fired Macro {macro}"
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, pending=len(self._pending))
 
-@mcp.tool()
-def press_softkey(index: int) -> str:
-    """Presses a softkey (1-12)."""
-    address = f"/eos/softkey/{index}"
-    client.send_message(address, 1.0)
-    client.send_message(address, 0.0)
-    print(f"Sent Softkey: {index}")
-    return f"Pressed Softkey {index}"
+def send_paced(address, value, additive=False):
+    """
+    Sends a continuous-control update through the outbound scheduler, or into
+    the current batch, and logs it once sent. Returns False if the scheduler
+    had no room for it.
+    """
+    if _pending_batch.get() is not None:
+        send_message(address, value)
+        log_sent(address, *(value if isinstance(value, list) else [value]))
+        return True
+    return current().outbound.submit(address, value, additive)
 
-@mcp.tool()
-def fire_preset(preset: int) -> str:
-    """Fires (recalls) a preset."""
-    address = "/eos/preset/fire"
-    client.send_message(address, preset)
-    print(f"Sent: {address} {preset}")
+def send_bundled(messages):
+    """Sends built messages to the current console in as few bundles as possible. Returns the bundle count."""
+    console = current()
+    bundles = pack_bundles([(_pack_int(msg.size), msg.dgram) for msg in messages])
+    console.outbound.flush_ahead()
+    for bundle in bundles:
+        console.transmit(bundle)
+        console.outbound.charge()
+    return len(bundles)
+
+# Seconds to wait for the console to answer a query
+QUERY_TIMEOUT = 2.0
+
+class PendingReplies:
+    """
+    Futures waiting for console replies, keyed on the reply address or a
+    prefix of it (for replies whose address carries data, such as
+    /eos/out/get/cue/<list>/<cue>/...). Replies to indexed requests end in
+    /list/<index>/<count> and can also be matched on that index. Fed by the
+    router for every inbound message, from whichever thread the listener
+    runs on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiting = {}
+
+    @staticmethod
+    def _key(address, index):
+        address = address.rstrip("/")
+        return address if index is None else (address, index)
+
+    def expect(self, address, index=None):
+        """Returns a future resolved with (address, args) by the next matching reply."""
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._waiting.setdefault(self._key(address, index), []).append(future)
+        return future
+
+    def discard(self, address, future, index=None):
+        key = self._key(address, index)
+        with self._lock:
+            futures = self._waiting.get(key)
+            if futures and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._waiting[key]
+
+    def resolve(self, address, args, route=None):
+        if not self._waiting:
+            return
+        parts = address.split("/")
+        index = None
+        # Only the record's own reply (.../<number>/list/<i>/<n>) answers an
+        # indexed request, not its sub-lists (.../channels/list/<i>/<n>, ...)
+        if len(parts) > 4 and parts[-3] == "list" and parts[-4][:1].isdigit():
+            try:
+                index = int(parts[-2])
+            except ValueError:
+                pass
+        matched = []
+        with self._lock:
+            for i in range(len(parts), 1, -1):
+                prefix = "/".join(parts[:i])
+                futures = self._waiting.pop(prefix, None)
+                if futures:
+                    matched.extend(futures)
+                if index is not None:
+                    futures = self._waiting.pop((prefix, index), None)
+                    if futures:
+                        matched.extend(futures)
+        for future in matched:
+            future.get_loop().call_soon_threadsafe(_set_reply, future, (address, args))
+
+def _set_reply(future, reply):
+    if not future.done():
+        future.set_result(reply)
+
+async def query(address, value, reply, timeout=QUERY_TIMEOUT, index=None):
+    """
+    Sends a request and waits for the console's reply on `reply` (an address
+    or address prefix), optionally only one for list index `index`.
+    Returns (address, args) of the reply.
+    Raises asyncio.TimeoutError if no reply arrives in time.
+    """
+    replies = current().replies
+    future = replies.expect(reply, index)
+    try:
+        send_message(address, value)
+        return await asyncio.wait_for(future, timeout)
+    finally:
+        replies.discard(reply, future, index)
+
+_background_tasks = set()
+
+def spawn(coro):
+    """
+    Runs coro as a task on the running event loop, holding a reference until
+    it finishes. Outside an event loop (e.g. the threaded listener) the
+    coroutine is dropped.
+    """
+    try:
+        task = asyncio.get_running_loop().create_task(coro)
+    except RuntimeError:
+        coro.close()
+        return None
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+class _RouteNode:
+    __slots__ = ("literals", "wildcard", "converter", "handler")
+
+    def __init__(self):
+        self.literals = {}
+        self.wildcard = None
+        self.converter = None
+        self.handler = None
+
+class Router:
+    """
+    Routes OSC addresses to handlers through a trie of path segments.
+
+    A pattern segment is either literal, a typed capture ("<int:bank>",
+    "<float:x>", "<str:cue>") or "*", which matches any segment without
+    capturing it. Handlers are called as handler(*captures, *args), with each
+    capture already converted. Resolved addresses are kept in an LRU cache.
+
+    Can be passed anywhere pythonosc expects a Dispatcher. Packets it
+    dispatches that way are attributed to its console, if it has one.
+    """
+    _CONVERTERS = {"int": int, "float": float, "str": str}
+
+    def __init__(self, console=None, cache_size=4096):
+        self.console = console
+        self._root = _RouteNode()
+        self._default_handler = None
+        self._taps = []
+        self.routes = []
+        self.resolve = functools.lru_cache(maxsize=cache_size)(self._resolve)
+
+    def map(self, pattern, handler):
+        node = self._root
+        for segment in pattern.strip("/").split("/"):
+            if segment == "*" or (segment.startswith("<") and segment.endswith(">")):
+                converter = None
+                if segment != "*":
+                    type_name = segment[1:-1].split(":", 1)[0]
+                    if type_name not in self._CONVERTERS:
+                        raise ValueError(f"Unknown capture type '{type_name}' in {pattern}")
+                    converter = self._CONVERTERS[type_name]
+                if node.wildcard is None:
+                    node.wildcard = _RouteNode()
+                    node.converter = converter
+                elif node.converter is not converter:
+                    raise ValueError(f"Conflicting capture at '{segment}' in {pattern}")
+                node = node.wildcard
+            else:
+                node = node.literals.setdefault(segment, _RouteNode())
+        node.handler = handler
+        self.routes.append((pattern, handler))
+        self.resolve.cache_clear()
+
+    def set_default_handler(self, handler):
+        self._default_handler = handler
+
+    def add_tap(self, tap):
+        """
+        Registers tap(address, args, route), called after routing for every
+        message; route is (handler, captures), or None if nothing matched.
+        """
+        self._taps.append(tap)
+
+    def _resolve(self, address):
+        """Returns (handler, captures) for an address, or None if nothing matches."""
+        return self._walk(self._root, address.strip("/").split("/"), 0, ())
+
+    def _walk(self, node, segments, i, captures):
+        if i == len(segments):
+            return (node.handler, captures) if node.handler is not None else None
+        segment = segments[i]
+        child = node.literals.get(segment)
+        if child is not None:
+            found = self._walk(child, segments, i + 1, captures)
+            if found is not None:
+                return found
+        if node.wildcard is not None:
+            if node.converter is not None:
+                try:
+                    captures = captures + (node.converter(segment),)
+                except ValueError:
+                    return None
+            return self._walk(node.wildcard, segments, i + 1, captures)
+        return None
+
+    def dispatch(self, address, *args):
+        route = self.resolve(address)
+        if route is not None:
+            handler, captures = route
+            start = time.perf_counter()
+            handler(*captures, *args)
+            metrics.observe("handlers", handler.__name__, time.perf_counter() - start)
+        else:
+            metrics.count("osc_in_unrouted")
+            if self._default_handler is not None:
+                self._default_handler(address, *args)
+        for tap in self._taps:
+            tap(address, args, route)
+
+    def call_handlers_for_packet(self, data, client_address):
+        """
+        Dispatches every message in a datagram, with current() returning the
+        router's console, and records the datagram if that console is being
+        captured. Bundle time tags are not waited on.
+        """
+        metrics.packet("in", len(data))
+        console = self.console
+        token = None
+        if console is not None:
+            if console.capture is not None:
+                console.capture.write(data)
+            token = _current_console.set(console)
+        try:
+            if osc_message.OscMessage.dgram_is_message(data):
+                msg = osc_message.OscMessage(data)
+                self.dispatch(msg.address, *msg.params)
+            else:
+                for timed_msg in osc_packet.OscPacket(data).messages:
+                    self.dispatch(timed_msg.message.address, *timed_msg.message.params)
+        except (osc_message.ParseError, osc_packet.ParseError):
+            pass
+        finally:
+            if token is not None:
+                _current_console.reset(token)
+        return []
+
+class StateStore:
+    """
+    Versioned console state.
+
+    Writers copy the nested dicts along the path they change and publish a
+    new root under a lock (copy-on-write), so a reader's snapshot is never
+    modified after it is taken and reads never block. Every write gets the
+    next sequence number, and recent changes are kept so clients can fetch
+    only what changed since a sequence they have seen.
+
+    Snapshots are shared between readers and must not be mutated.
+    """
+
+    def __init__(self, initial, history=4096):
+        self._lock = threading.Lock()
+        self._current = (0, dict(initial))
+        self._history = collections.deque(maxlen=history)
+        # Highest sequence with a change that has dropped out of the history
+        self._evicted_seq = 0
+
+    @property
+    def seq(self):
+        return self._current[0]
+
+    def snapshot(self):
+        """Returns the current state as a read-only dict."""
+        return self._current[1]
+
+    def versioned_snapshot(self):
+        """Returns (seq, state) taken together."""
+        return self._current
+
+    def set(self, path, value):
+        self.update({path: value})
+
+    def next_seq(self):
+        """Reserves a sequence number for a change kept outside the store (see BankTable)."""
+        with self._lock:
+            seq, root = self._current
+            self._current = (seq + 1, root)
+            return seq + 1
+
+    def update(self, changes):
+        """
+        Applies {path: value} changes as one write with a single sequence number.
+        A path is a key or a tuple of keys; missing intermediate dicts are created.
+        """
+        with self._lock:
+            seq, root = self._current
+            root = dict(root)
+            seq += 1
+            for path, value in changes.items():
+                if not isinstance(path, tuple):
+                    path = (path,)
+                node = root
+                for key in path[:-1]:
+                    child = dict(node.get(key, {}))
+                    node[key] = child
+                    node = child
+                node[path[-1]] = value
+                if len(self._history) == self._history.maxlen:
+                    self._evicted_seq = self._history[0][0]
+                self._history.append((seq, path, value))
+            self._current = (seq, root)
+            return seq
+
+    def delta(self, since):
+        """
+        Returns (seq, changes) where changes maps each path written after
+        `since` to its latest value, or (seq, None) if `since` is older than
+        the retained history, or newer than seq (a number from before a
+        server restart), and the caller must re-read the full snapshot.
+        """
+        with self._lock:
+            seq = self._current[0]
+            evicted_seq = self._evicted_seq
+            history = list(self._history)
+        if since == seq:
+            return seq, {}
+        if since > seq or since < evicted_seq:
+            return seq, None
+        changes = {}
+        for change_seq, path, value in history:
+            if change_seq > since:
+                changes.pop(path, None)
+                changes[path] = value
+        return seq, changes
+
+def initial_state():
+    """The state a console starts with, before Eos has reported anything."""
+    return {
+        "active_cue_list": None,
+        "active_cue_number": None,
+        "active_cue_percent": 0.0,
+        "active_cue_text": "",
+        "pending_cue_list": None,
+        "pending_cue_number": None,
+        "pending_cue_text": "",
+        "live_blind_state": 1,
+        "command_line": "",
+        "active_channels": "",
+        "wheels": {},
+        "pantilt": (),
+        "xyz": ()
+    }
+
+def _label_tokens(label):
+    return set(str(label).lower().split())
+
+def _cue_sort_key(number):
+    """Orders cue numbers ("5", "5.5", "10") numerically, then by part."""
+    parts = number.split("/")
+    try:
+        cue = float(parts[1])
+    except ValueError:
+        cue = float("inf")
+    return (cue, int(parts[2]) if len(parts) > 2 else 0, number)
+
+FADER_BANK_SIZE = 10
+DS_BANK_SIZE = 20
+MAX_FADER_BANKS = 32
+MAX_DS_BANKS = 32
+
+class BankTable:
+    """
+    Fixed-layout storage for fader or direct select banks. Each bank takes a
+    slot of `size` entries in flat tables: an array('f') of levels, a label
+    list, a dirty bitmap marking entries that have received data, and an
+    array('Q') of the eos_state sequence number of each entry's last change.
+    Banks get a slot on first use, up to max_banks; data for further banks
+    (or entries past `size`) is counted in `rejected` and ignored.
+
+    Writes come from the listener and readers from tool worker threads, so
+    both hold a lock. A write reserves its sequence number (next_seq) while
+    holding it, so a reader that has seen a sequence number also sees the
+    change made under it.
+    """
+
+    def __init__(self, size, max_banks):
+        self.size = size
+        self.max_banks = max_banks
+        entries = size * max_banks
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._bank_labels = [""] * max_banks
+        self._bank_versions = array.array("Q", bytes(8 * max_banks))
+        self.levels = array.array("f", bytes(4 * entries))
+        self.labels = [""] * entries
+        self.dirty = bytearray((entries + 7) // 8)
+        self.versions = array.array("Q", bytes(8 * entries))
+        self.rejected = 0
+
+    def _slot(self, bank):
+        slot = self._slots.get(bank)
+        if slot is None and len(self._slots) < self.max_banks:
+            slot = self._slots[bank] = len(self._slots)
+        return slot
+
+    def _entry(self, bank, index):
+        """Returns the flat position of a 1-based entry, or None if it does not fit."""
+        slot = self._slot(bank)
+        if slot is None or not 1 <= index <= self.size:
+            self.rejected += 1
+            return None
+        return slot * self.size + index - 1
+
+    def set_bank_label(self, bank, label, next_seq):
+        with self._lock:
+            slot = self._slot(bank)
+            if slot is None:
+                self.rejected += 1
+                return
+            self._bank_labels[slot] = label
+            self._bank_versions[slot] = next_seq()
+
+    def set_level(self, bank, index, level, next_seq):
+        with self._lock:
+            pos = self._entry(bank, index)
+            if pos is not None:
+                self.levels[pos] = level
+                self.dirty[pos >> 3] |= 1 << (pos & 7)
+                self.versions[pos] = next_seq()
+
+    def set_label(self, bank, index, label, next_seq):
+        with self._lock:
+            pos = self._entry(bank, index)
+            if pos is not None:
+                self.labels[pos] = label
+                self.dirty[pos >> 3] |= 1 << (pos & 7)
+                self.versions[pos] = next_seq()
+
+    def __contains__(self, bank):
+        with self._lock:
+            return bank in self._slots
+
+    def bank_label(self, bank):
+        with self._lock:
+            return self._bank_labels[self._slots[bank]]
+
+    def entries(self, bank):
+        """Returns [(index, label, level)] for each entry of a bank that has received data."""
+        with self._lock:
+            base = self._slots[bank] * self.size
+            return [(pos - base + 1, self.labels[pos], self.levels[pos])
+                    for pos in range(base, base + self.size)
+                    if self.dirty[pos >> 3] & (1 << (pos & 7))]
+
+    def banks(self):
+        with self._lock:
+            return sorted(self._slots)
+
+    def changes(self, since):
+        """Returns [(seq, bank, index, label, level)] for entries changed after since; index 0 is the bank label."""
+        result = []
+        with self._lock:
+            for bank, slot in self._slots.items():
+                if self._bank_versions[slot] > since:
+                    result.append((self._bank_versions[slot], bank, 0, self._bank_labels[slot], None))
+                base = slot * self.size
+                for pos in range(base, base + self.size):
+                    if self.versions[pos] > since:
+                        result.append((self.versions[pos], bank, pos - base + 1, self.labels[pos], self.levels[pos]))
+        return result
+
+
+class ChannelSet:
+    """
+    Immutable set of channel numbers, stored as sorted, disjoint,
+    non-adjacent [first, last] intervals in two arrays, so a selection of
+    thousands of channels in a few ranges is a few entries. Membership is a
+    binary search; union (|), intersection (&) and difference (-) merge the
+    interval lists in linear time.
+    """
+    __slots__ = ("_firsts", "_lasts", "_size")
+
+    def __init__(self, intervals=()):
+        """intervals: sorted, disjoint, non-adjacent (first, last) pairs; see from_ranges for any others."""
+        intervals = list(intervals)
+        self._firsts = array.array("q", [first for first, _ in intervals])
+        self._lasts = array.array("q", [last for _, last in intervals])
+        self._size = sum(last - first + 1 for first, last in intervals)
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        """Builds a set from (first, last) pairs in any order, overlapping or not."""
+        merged = []
+        for first, last in sorted(r for r in ranges if r[0] <= r[1]):
+            if merged and first <= merged[-1][1] + 1:
+                if last > merged[-1][1]:
+                    merged[-1][1] = last
+            else:
+                merged.append([first, last])
+        return cls(merged)
+
+    @classmethod
+    def from_channels(cls, channels):
+        return cls.from_ranges((ch, ch) for ch in channels)
+
+    @classmethod
+    def parse(cls, values):
+        """
+        Parses channel lists as Eos prints and accepts them: a string or list
+        of items such as 5, "1-10", "1-10,12", "1 Thru 10 - 5 + 12". Text
+        after a "[" (the level and label in /eos/out/active/chan) and from
+        the first word that is not part of a channel list is ignored.
+        """
+        if isinstance(values, (str, int, float)):
+            values = [values]
+        tokens = []
+        for value in values:
+            text = str(value).split("[", 1)[0]
+            tokens.extend(t for t in text.replace(",", " ").replace("+", " + ").split() if t)
+        result = cls()
+        pending = []
+        subtract = False
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token.lower() in ("chan", "channel") and i == 0:
+                i += 1
+                continue
+            if token in ("+", "-"):
+                if pending:
+                    result = result - cls.from_ranges(pending) if subtract else result | cls.from_ranges(pending)
+                    pending = []
+                subtract = token == "-"
+                i += 1
+                continue
+            try:
+                if "-" in token[1:]:
+                    first, last = token.split("-", 1)
+                    first, last = int(float(first)), int(float(last))
+                else:
+                    first = last = int(float(token))
+            except ValueError:
+                break
+            if i + 2 < len(tokens) and tokens[i + 1].lower() == "thru":
+                try:
+                    last = int(float(tokens[i + 2]))
+                except ValueError:
+                    break
+                i += 2
+            pending.append((min(first, last), max(first, last)))
+            i += 1
+        if pending:
+            result = result - cls.from_ranges(pending) if subtract else result | cls.from_ranges(pending)
+        return result
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, channel):
+        i = bisect.bisect_right(self._firsts, channel) - 1
+        return i >= 0 and channel <= self._lasts[i]
+
+    def __iter__(self):
+        for first, last in zip(self._firsts, self._lasts):
+            yield from range(first, last + 1)
+
+    def __eq__(self, other):
+        return isinstance(other, ChannelSet) and self._firsts == other._firsts and self._lasts == other._lasts
+
+    def intervals(self):
+        return list(zip(self._firsts, self._lasts))
+
+    def __or__(self, other):
+        return ChannelSet.from_ranges(self.intervals() + other.intervals())
+
+    def __and__(self, other):
+        a, b = self.intervals(), other.intervals()
+        result = []
+        i = j = 0
+        while i < len(a) and j < len(b):
+            first, last = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+            if first <= last:
+                result.append((first, last))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return ChannelSet(result)
+
+    def __sub__(self, other):
+        b = other.intervals()
+        result = []
+        j = 0
+        for first, last in self.intervals():
+            while j < len(b) and b[j][1] < first:
+                j += 1
+            k = j
+            start = first
+            while k < len(b) and b[k][0] <= last:
+                if b[k][0] > start:
+                    result.append((start, b[k][0] - 1))
+                start = max(start, b[k][1] + 1)
+                k += 1
+            if start <= last:
+                result.append((start, last))
+        return ChannelSet(result)
+
+    def __str__(self):
+        return ", ".join(str(f) if f == l else f"{f}-{l}" for f, l in self.intervals())
+
+    def __repr__(self):
+        return f"ChannelSet({str(self)!r})"
+
+class ShowCache:
+    """
+    Show records (cues, patch, groups, palettes, ...) downloaded from the
+    console, keyed by target and record number. Each record holds the
+    console's uid, label and remaining reply arguments as data.
+
+    Kept alongside are a label word index, a channel -> groups/palettes
+    index and each cue list's cues in cue order, updated as records are
+    written so searches never scan the whole show.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = {}
+        self._labels = collections.defaultdict(set)
+        self._record_channels = {}
+        self._channel_members = collections.defaultdict(set)
+        self._cue_order = collections.defaultdict(list)
+        # Targets fetched by a show sync, kept current from notify messages
+        self.synced = set()
+        # (target, number) of records the console reported changed but did not re-send
+        self.stale = set()
+
+    def put(self, target, number, record):
+        with self._lock:
+            self.stale.discard((target, number))
+            self._unindex(target, number)
+            self._records.setdefault(target, {})[number] = record
+            key = (target, number)
+            for token in _label_tokens(record.get("label", "")):
+                self._labels[token].add(key)
+            if target == "cue":
+                bisect.insort(self._cue_order[number.split("/")[0]], _cue_sort_key(number))
+
+    def remove(self, target, number):
+        with self._lock:
+            self.stale.discard((target, number))
+            self._unindex(target, number)
+            self._set_channels(target, number, ())
+            self._records.get(target, {}).pop(number, None)
+
+    def mark_stale(self, target, number):
+        """Flags a cached record as possibly out of date, until it is next written."""
+        with self._lock:
+            if number in self._records.get(target, {}):
+                self.stale.add((target, number))
+
+    def _unindex(self, target, number):
+        old = self._records.get(target, {}).get(number)
+        if old is None:
+            return
+        key = (target, number)
+        for token in _label_tokens(old.get("label", "")):
+            self._labels[token].discard(key)
+            if not self._labels[token]:
+                del self._labels[token]
+        if target == "cue":
+            order = self._cue_order[number.split("/")[0]]
+            i = bisect.bisect_left(order, _cue_sort_key(number))
+            if i < len(order) and order[i][2] == number:
+                del order[i]
+
+    def set_channels(self, target, number, channels):
+        """Records which channels (a ChannelSet) a group or palette contains."""
+        with self._lock:
+            self._set_channels(target, number, channels)
+
+    def _set_channels(self, target, number, channels):
+        key = (target, number)
+        for chan in self._record_channels.pop(key, ()):
+            self._channel_members[chan].discard(key)
+            if not self._channel_members[chan]:
+                del self._channel_members[chan]
+        if channels:
+            self._record_channels[key] = channels
+            for chan in channels:
+                self._channel_members[chan].add(key)
+
+    def get(self, target, number):
+        return self._records.get(target, {}).get(number)
+
+    def channels(self, target, number):
+        return self._record_channels.get((target, number), ChannelSet())
+
+    def records(self, target):
+        with self._lock:
+            return dict(self._records.get(target, {}))
+
+    def counts(self):
+        with self._lock:
+            return {target: len(records) for target, records in self._records.items()}
+
+    def find_label(self, text, target=None):
+        """Returns (target, number) of records whose label contains every word of text, sorted."""
+        tokens = _label_tokens(text)
+        if not tokens:
+            return []
+        with self._lock:
+            sets = sorted((self._labels.get(token, set()) for token in tokens), key=len)
+            found = set.intersection(*sets) if sets[0] else set()
+            needle = str(text).lower()
+            return sorted(
+                key for key in found
+                if (target is None or key[0] == target)
+                and needle in str(self._records[key[0]][key[1]].get("label", "")).lower()
+            )
+
+    def containing_channel(self, channel):
+        """Returns (target, number) of groups and palettes that contain channel, sorted."""
+        with self._lock:
+            return sorted(self._channel_members.get(channel, ()))
+
+    def cue_list(self, list_num):
+        """Returns the cue numbers of a cue list in cue order."""
+        with self._lock:
+            return [number for _, _, number in self._cue_order.get(str(list_num), ())]
+
+    def clear(self, target=None):
+        with self._lock:
+            if target is None:
+                self.synced.clear()
+            else:
+                self.synced.discard(target)
+            targets = list(self._records) if target is None else [target]
+            self.stale = {key for key in self.stale if key[0] not in targets}
+            for t in targets:
+                for number in list(self._records.get(t, {})):
+                    self._unindex(t, number)
+                    self._set_channels(t, number, ())
+                self._records.pop(t, None)
+
+
+Event = collections.namedtuple("Event", "seq time type address captures args")
+
+class EventLog:
+    """
+    Bounded ring buffer of typed events, one per routed inbound message. The
+    event type is the handler name without its "handle_" prefix (e.g.
+    "fader_level", "active_cue"). Waiters block on an asyncio condition that
+    is notified when events arrive, so nothing has to poll.
+    """
+
+    def __init__(self, size=4096):
+        self._lock = threading.Lock()
+        self._events = collections.deque(maxlen=size)
+        self._seq = 0
+        self._loop = None
+        self._changed = None
+        self._waiters = 0
+        self._notify_scheduled = False
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def record(self, address, args, route):
+        """Router tap: appends an event for every message that matched a handler."""
+        if route is None:
+            return
+        handler, captures = route
+        name = handler.__name__
+        event_type = name[7:] if name.startswith("handle_") else name
+        with self._lock:
+            self._seq += 1
+            self._events.append(Event(self._seq, time.time(), event_type, address, captures, args))
+        if self._waiters and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._schedule_notify)
+
+    def _schedule_notify(self):
+        # Coalesces a burst of events into a single wake-up
+        if not self._notify_scheduled:
+            self._notify_scheduled = True
+            spawn(self._notify())
+
+    async def _notify(self):
+        self._notify_scheduled = False
+        async with self._changed:
+            self._changed.notify_all()
+
+    def since(self, seq, filters=None):
+        """
+        Returns (events, dropped): buffered events after seq that match any of
+        filters (event types, or address prefixes starting with "/"), and
+        whether older events after seq have already left the buffer.
+        """
+        with self._lock:
+            events = list(self._events)
+        dropped = bool(events) and events[0].seq > seq + 1
+        events = [e for e in events if e.seq > seq and _event_matches(e, filters)]
+        return events, dropped
+
+    async def wait(self, since, filters=None, timeout=30.0):
+        """Waits until events after `since` match filters, or timeout. Returns (events, dropped)."""
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._loop is not loop:
+            self._loop = loop
+            self._changed = asyncio.Condition()
+        deadline = loop.time() + timeout
+        self._waiters += 1
+        try:
+            async with self._changed:
+                while True:
+                    events, dropped = self.since(since, filters)
+                    remaining = deadline - loop.time()
+                    if events or remaining <= 0:
+                        return events, dropped
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._waiters -= 1
+
+def _event_matches(event, filters):
+    if not filters:
+        return True
+    for f in filters:
+        if f.startswith("/") and event.address.startswith(f):
+            return True
+        if f == event.type:
+            return True
+    return False
+
+def events_json(events, dropped, seq):
+    return json.dumps({
+        "seq": seq,
+        "dropped": dropped,
+        "events": [event._asdict() for event in events],
+    }, default=str)
+
+# Wheel categories reported with /eos/out/active/wheel/<n>
+WHEEL_CATEGORIES = {0: "none", 1: "intensity", 2: "focus", 3: "color", 4: "image", 5: "form", 6: "shutter"}
+
+class ChannelParams:
+    """
+    Last known parameter values per channel. Eos only reports parameters
+    (/eos/out/active/wheel/<n>) for the selected channel, so values are
+    recorded against the selection when exactly one channel is selected.
+    Each channel keeps the monotonic time of its last update so readers can
+    tell how stale it is.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # channel -> [updated (time.monotonic()), {param: (value, category)}]
+        self._channels = {}
+        self.selected = ChannelSet()
+
+    def select(self, selection):
+        self.selected = selection
+
+    def update(self, channel, param, value, category=None):
+        with self._lock:
+            entry = self._channels.get(channel)
+            if entry is None:
+                entry = self._channels[channel] = [0.0, {}]
+            entry[0] = time.monotonic()
+            entry[1][param] = (value, category)
+
+    def get(self, channel):
+        """Returns (age in seconds, {param: (value, category)}) for a channel, or None if never seen."""
+        with self._lock:
+            entry = self._channels.get(channel)
+            if entry is None:
+                return None
+            return time.monotonic() - entry[0], dict(entry[1])
+
+    def updated_since(self, channel, since):
+        entry = self._channels.get(channel)
+        return entry is not None and entry[0] >= since
+
+    def stale(self, channels, max_age):
+        """Returns the channels with no values, or values older than max_age seconds."""
+        oldest = time.monotonic() - max_age
+        with self._lock:
+            return [ch for ch in channels if ch not in self._channels or self._channels[ch][0] < oldest]
+
+    def clear(self):
+        with self._lock:
+            self._channels.clear()
+
+# Percent samples kept per cue run, cue runs kept per console, and how many
+# of the latest samples the completion estimate is fitted to (few, so it
+# follows a fade curve)
+CUE_PROGRESS_SAMPLES = 512
+CUE_PROGRESS_RUNS = 32
+CUE_ETA_SAMPLES = 8
+
+class CueProgress:
+    """
+    Timelines of (monotonic time, fraction complete) for the latest cue runs,
+    fed by handle_active_cue, and futures waiting for a cue to get to a given
+    fraction. A cue's timeline starts over when it becomes active again or
+    its percent goes backwards. Waiters are resolved from the listener, like
+    PendingReplies, so nothing polls. triggered is when this server last
+    fired a cue or pressed Go on the console.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs = collections.OrderedDict()
+        # Monotonic start time of each run in _runs (its deque drops old samples)
+        self._starts = {}
+        self._waiters = []
+        self.active = None
+        self.triggered = None
+
+    def trigger(self, at):
+        """Records that a cue was fired or Go pressed at monotonic time at."""
+        with self._lock:
+            if self.triggered is None or at > self.triggered:
+                self.triggered = at
+
+    def record(self, list_num, cue_num, fraction):
+        key = (str(list_num), str(cue_num))
+        with self._lock:
+            samples = self._runs.get(key)
+            previous = self.active
+            new_run = key != previous or samples is None or fraction < samples[-1][1]
+            now = time.monotonic()
+            if new_run:
+                samples = self._runs[key] = collections.deque(maxlen=CUE_PROGRESS_SAMPLES)
+                self._starts[key] = now
+                self._runs.move_to_end(key)
+                if len(self._runs) > CUE_PROGRESS_RUNS:
+                    oldest, _ = self._runs.popitem(last=False)
+                    del self._starts[oldest]
+                self.active = key
+            samples.append((now, fraction))
+            if not self._waiters:
+                return
+            resolved = []
+            waiting = []
+            for waiter in self._waiters:
+                wanted, target, future = waiter
+                if wanted is None and new_run or wanted == key and fraction >= target:
+                    resolved.append((future, (key, fraction, False)))
+                elif new_run and wanted == previous and wanted != key:
+                    last = self._runs[previous][-1][1] if previous in self._runs else 0.0
+                    resolved.append((future, (previous, last, True)))
+                else:
+                    waiting.append(waiter)
+            self._waiters = waiting
+        for future, result in resolved:
+            future.get_loop().call_soon_threadsafe(_set_reply, future, result)
+
+    def expect(self, key, fraction, since=None):
+        """
+        Returns a future resolved with (key, fraction, superseded) once cue
+        key = (list, cue) gets to fraction, or once another cue replaces it
+        as the active cue (superseded). If its latest run is already there,
+        the future is done at once, but only if that run started at or after
+        monotonic time since, when given. With key None it resolves when the
+        next cue run starts.
+        """
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            samples = self._runs.get(key) if key is not None else None
+            if samples and samples[-1][1] >= fraction and (since is None or self._starts[key] >= since):
+                future.set_result((key, samples[-1][1], False))
+            else:
+                self._waiters.append((key, fraction, future))
+        return future
+
+    def discard(self, future):
+        with self._lock:
+            self._waiters = [w for w in self._waiters if w[2] is not future]
+
+    def timeline(self, key):
+        """Returns the samples of the cue's latest run, oldest first."""
+        with self._lock:
+            return list(self._runs.get(key, ()))
+
+    def eta(self, key):
+        """
+        Seconds until the cue's latest run completes, from a least-squares
+        line through its latest samples. 0 once complete; None without at
+        least two samples or if the cue is not advancing.
+        """
+        samples = self.timeline(key)[-CUE_ETA_SAMPLES:]
+        if samples and samples[-1][1] >= 1.0:
+            return 0.0
+        if len(samples) < 2:
+            return None
+        n = len(samples)
+        mean_t = sum(t for t, _ in samples) / n
+        mean_f = sum(f for _, f in samples) / n
+        var = sum((t - mean_t) ** 2 for t, _ in samples)
+        if var <= 0:
+            return None
+        slope = sum((t - mean_t) * (f - mean_f) for t, f in samples) / var
+        if slope <= 0:
+            return None
+        return max(mean_t + (1.0 - mean_f) / slope - time.monotonic(), 0.0)
+
+# Generator frames per second, and output steps across a generator's range
+# (values are quantized to these before diffing against the last frame)
+GENERATOR_FRAME_RATE = 30.0
+GENERATOR_STEPS = 1000
+GENERATOR_MAX_TARGETS = 4096
+
+# Waveforms map a phase in [0, 1) and a duty cycle to [0, 1]
+WAVEFORMS = {
+    "sine": lambda p, duty: 0.5 - 0.5 * math.cos(2 * math.pi * p),
+    "triangle": lambda p, duty: 1 - abs(2 * p - 1),
+    "saw": lambda p, duty: p,
+    "square": lambda p, duty: 1.0 if p < duty else 0.0,
+    "chase": lambda p, duty: 1.0 if p < duty else 0.0,
+}
+
+class Generator:
+    """
+    A waveform driving one OSC address per target. Each target's phase is
+    offset by its position times spread/len(targets) cycles. A frame
+    computes every target's level in one pass and returns only those that
+    changed since the last frame, as pre-encoded bundle elements: the
+    message head of each target and the packed value of each of the
+    GENERATOR_STEPS + 1 levels are encoded once, up front.
+    """
+
+    def __init__(self, generator_id, waveform, label, addresses, rate, low, high, spread):
+        self.id = generator_id
+        self.waveform = waveform
+        self.label = label
+        self.addresses = addresses
+        self.rate = rate
+        self.low = low
+        self.high = high
+        self.spread = spread
+        n = len(addresses)
+        self._wave = WAVEFORMS[waveform]
+        # A chase lights one target at a time; a square is on for half its cycle
+        self._duty = 1 / n if waveform == "chase" else 0.5
+        self._offsets = [spread * i / n for i in range(n)]
+        self._last = array.array("h", [-1] * n)
+        self._heads = [osc_element_head(address) for address in addresses]
+        scale = (high - low) / GENERATOR_STEPS
+        self._values = [_pack_float(low + level * scale) for level in range(GENERATOR_STEPS + 1)]
+        # Largest bundle element this generator produces
+        self.element_size = max(map(len, self._heads)) + 4
+        self.values_sent = 0
+        # Changed values the last frame left out for lack of budget
+        self.held = 0
+
+    def frame(self, t, limit=None):
+        """
+        Returns [(head, packed value)] for the targets whose quantized level
+        changed at time t, at most limit of them. Targets left out keep their
+        previous level, so they are sent by a later frame.
+        """
+        base = t * self.rate
+        wave = self._wave
+        duty = self._duty
+        levels = [round(wave((base + offset) % 1.0, duty) * GENERATOR_STEPS) for offset in self._offsets]
+        last = self._last
+        heads = self._heads
+        values = self._values
+        changed = [i for i, level in enumerate(levels) if level != last[i]]
+        self.held = 0
+        if limit is not None and len(changed) > limit:
+            self.held = len(changed) - limit
+            changed = changed[:limit]
+            for i in changed:
+                last[i] = levels[i]
+        elif changed:
+            self._last = array.array("h", levels)
+        self.values_sent += len(changed)
+        return [(heads[i], values[levels[i]]) for i in changed]
+
+    def status(self):
+        return {
+            "id": self.id, "waveform": self.waveform, "target": self.label,
+            "targets": len(self.addresses), "rate_hz": self.rate,
+            "low": self.low, "high": self.high, "spread": self.spread,
+            "values_sent": self.values_sent,
+        }
+
+class GeneratorEngine:
+    """
+    Runs a console's generators on one frame clock. Each frame gathers the
+    changed values of every generator, computed for the time the frame
+    actually runs, and sends them as packed OSC bundles. Frames are
+    scheduled against the start time; if the loop falls more than a frame
+    behind, the missed frames are skipped and counted rather than sent in a
+    burst. Bundles are spent from the console's outbound token bucket: a
+    frame sends only as many values as the bucket's packets can carry
+    (the rest wait for a later frame), and a frame with no packets left is
+    skipped. The task runs only while there are generators.
+    """
+
+    def __init__(self, console, frame_rate=GENERATOR_FRAME_RATE):
+        self.console = console
+        self.frame_rate = frame_rate
+        self.generators = {}
+        self.frames = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.bundles = 0
+        self.frame_time = Histogram()
+        self._task = None
+
+    def add(self, generator):
+        self.generators[generator.id] = generator
+        if self._task is None or self._task.done():
+            self._task = spawn(self._run())
+
+    def remove(self, generator_id=None):
+        """Stops one generator, or all of them. Returns the ids stopped."""
+        ids = list(self.generators) if generator_id is None else [generator_id] if generator_id in self.generators else []
+        for i in ids:
+            del self.generators[i]
+        if not self.generators and self._task is not None:
+            self._task.cancel()
+            self._task = None
+        return ids
+
+    def tick(self, t):
+        """
+        Computes and sends one frame at generator time t, within the outbound
+        packet budget. Returns the number of values sent.
+        """
+        generators = list(self.generators.values())
+        outbound = self.console.outbound
+        packets = outbound.available()
+        if not packets:
+            self.skipped += 1
+            return 0
+        # Every bundle but the last holds at least this many elements
+        per_bundle = max((OSC_MAX_DATAGRAM - len(OSC_BUNDLE_HEADER)) // max(g.element_size for g in generators), 1)
+        limit = packets * per_bundle
+        elements = []
+        for generator in generators:
+            elements.extend(generator.frame(t, limit - len(elements)))
+        if any(generator.held for generator in generators):
+            self.deferred += 1
+        bundles = pack_bundles(elements)
+        for bundle in bundles:
+            self.console.transmit(bundle)
+        outbound.charge(len(bundles))
+        self.bundles += len(bundles)
+        return len(elements)
+
+    async def _run(self):
+        period = 1 / self.frame_rate
+        start = time.monotonic()
+        frame = 0
+        while self.generators:
+            now = time.monotonic()
+            self.tick(now - start)
+            self.frames += 1
+            self.frame_time.observe(time.monotonic() - now)
+            frame += 1
+            late = int((time.monotonic() - start) / period) - frame
+            if late > 0:
+                self.dropped += late
+                frame += late
+            await asyncio.sleep(max(start + frame * period - time.monotonic(), 0))
+
+    def status(self):
+        return {
+            "frame_rate": self.frame_rate,
+            "frames": self.frames,
+            "dropped_frames": self.dropped,
+            "skipped_frames": self.skipped,
+            "deferred_frames": self.deferred,
+            "bundles": self.bundles,
+            "frame_time": self.frame_time.summary(),
+            "generators": [g.status() for g in self.generators.values()],
+        }
+
+    def stats(self):
+        return {"frames": self.frames, "dropped_frames": self.dropped, "skipped_frames": self.skipped,
+                "deferred_frames": self.deferred, "bundles": self.bundles}
+
+DMX_UNIVERSE_SIZE = 512
+DMX_MAX_UNIVERSE = 256
+
+class DmxShadow:
+    """
+    The last value sent to each DMX address, per universe: a bytearray of
+    levels and one of flags marking addresses whose value is known. Block
+    writes are diffed against it so only changed addresses are sent; an
+    address not yet written by a block (or since changed by set_dmx) is
+    always sent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._universes = {}
+
+    def diff(self, universe, start, values, force=False):
+        """
+        Records values (bytes, slots start, start+1, ... of universe, 1-based)
+        as sent and returns [(slot, value)] for the ones that changed.
+        """
+        with self._lock:
+            levels, known = self._universes.setdefault(
+                universe, (bytearray(DMX_UNIVERSE_SIZE), bytearray(DMX_UNIVERSE_SIZE)))
+            base = start - 1
+            end = base + len(values)
+            if force or levels[base:end] != values or known[base:end].count(0):
+                changed = [(base + i + 1, v) for i, v in enumerate(values)
+                           if force or not known[base + i] or levels[base + i] != v]
+            else:
+                changed = []
+            levels[base:end] = values
+            known[base:end] = b"\x01" * len(values)
+            return changed
+
+    def forget(self, universe, slot):
+        """Marks an address as unknown, so the next block write sends it."""
+        with self._lock:
+            entry = self._universes.get(universe)
+            if entry is not None:
+                entry[1][slot - 1] = 0
+
+    def get(self, universe):
+        """Returns (levels, known) copies for a universe."""
+        with self._lock:
+            levels, known = self._universes.get(
+                universe, (bytearray(DMX_UNIVERSE_SIZE), bytearray(DMX_UNIVERSE_SIZE)))
+            return bytes(levels), bytes(known)
+
+class _OfflineClient:
+    """Client for consoles with no connection (e.g. rebuilt from a capture); drops everything sent."""
+
+    def send(self, content):
+        pass
+
+class Console:
+    """
+    One console connection: its OSC client and listener, outbound pacing,
+    pending queries, and everything the server knows about that console
+    (state, fader and direct select banks, show cache, channel parameters,
+    cue progress, events, DMX shadow) and its running generators. transport is "udp",
+    "tcp", or "offline" for a console that is only fed by replaying captures.
+    """
+
+    def __init__(self, name, host=EOS_IP, port_tx=EOS_PORT_TX, port_rx=EOS_PORT_RX,
+                 transport="udp", port_tcp=EOS_PORT_TCP, user=None):
+        self.name = name
+        self.host = host
+        self.port_tx = port_tcp if transport == "tcp" else port_tx
+        self.port_rx = port_rx
+        self.transport = transport
+        self.user = user
+        if transport == "tcp":
+            self.client = TcpOscClient(host, port_tcp, on_reconnect=self.resync)
+        elif transport == "offline":
+            self.client = _OfflineClient()
+        else:
+            # Opened on first send, so constructing a console opens no socket
+            self.client = None
+        self.outbound = OutboundScheduler(self.send_now)
+        self.replies = PendingReplies()
+        self.state = StateStore(initial_state())
+        self.fader_banks = BankTable(FADER_BANK_SIZE, MAX_FADER_BANKS)
+        self.ds_banks = BankTable(DS_BANK_SIZE, MAX_DS_BANKS)
+        self.show_cache = ShowCache()
+        self.channel_params = ChannelParams()
+        self.cue_progress = CueProgress()
+        self.generators = GeneratorEngine(self)
+        self.dmx = DmxShadow()
+        self.events = EventLog()
+        # PacketCapture recording this console's inbound datagrams, if any
+        self.capture = None
+        self._listener = None
+
+    def command_address(self, address):
+        """Prefixes commands with /eos/user/<n> when the connection acts as an OSC user."""
+        if self.user is None or not address.startswith("/eos/") or address.startswith(("/eos/get/", "/eos/user/")):
+            return address
+        return f"/eos/user/{self.user}/{address[5:]}"
+
+    def transmit(self, content):
+        """Sends a built message or bundle to this console and counts it."""
+        (self.client or self._open_client()).send(content)
+        metrics.packet("out", content.size)
+
+    def _open_client(self):
+        self.client = udp_client.SimpleUDPClient(self.host, self.port_tx)
+        return self.client
+
+    def send_now(self, address, value):
+        self.transmit(build_message(self.command_address(address), value))
+
+    async def start(self):
+        if self.transport == "tcp":
+            await self.client.start(build_router(self))
+        elif self.transport == "udp":
+            self._listener = await start_async_osc_listener(self)
+        self.outbound.attach(asyncio.get_running_loop())
+
+    async def close(self):
+        self.generators.remove()
+        self.outbound.attach(None)
+        self.outbound.flush(limited=False)
+        if self.transport == "tcp":
+            await self.client.close()
+        elif self.transport == "udp":
+            if self._listener is not None:
+                self._listener.close()
+                self._listener = None
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+
+    async def resync(self):
+        """Re-requests console state, and show data if it was synced, after the connection comes back."""
+        _current_console.set(self)
+        await sync_state()
+        if self.show_cache.synced:
+            await sync_show_data([t for t in SHOW_TARGETS if t in self.show_cache.synced])
+
+# The console the running tool call or inbound packet belongs to
+_current_console = contextvars.ContextVar("_current_console", default=None)
+
+def current():
+    """Returns the console the current tool call or inbound message is for (the default console if none)."""
+    return _current_console.get() or pool.default
+
+class ConsolePool:
+    """Named console connections. The first one added is the default."""
+
+    def __init__(self, config):
+        self.consoles = {}
+        self.default = None
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        for name, options in config.items():
+            self.add(Console(name, **options))
+
+    def add(self, console):
+        if console.name in self.consoles:
+            raise ValueError(f"Console '{console.name}' already exists")
+        self.consoles[console.name] = console
+        if self.default is None:
+            self.default = console
+
+    def select(self, names=None):
+        """
+        Returns the consoles named by names: None for the default console,
+        "all" (every console but offline ones, unless all are offline), or
+        one or more comma-separated names.
+        Raises ValueError for an unknown name.
+        """
+        if not names:
+            return [self.default]
+        if names == "all":
+            live = [c for c in self.consoles.values() if c.transport != "offline"]
+            return live or list(self.consoles.values())
+        consoles = []
+        for name in names.split(","):
+            console = self.consoles.get(name.strip())
+            if console is None:
+                raise ValueError(f"Unknown console '{name.strip()}'. Known: {', '.join(self.consoles)}")
+            if console not in consoles:
+                consoles.append(console)
+        return consoles
+
+    @property
+    def started(self):
+        return self._started
+
+    async def start(self):
+        """Starts every console's connection, once; concurrent callers wait for the first."""
+        async with self._start_lock:
+            if self._started:
+                return
+            await asyncio.gather(*(console.start() for console in self.consoles.values()))
+            self._started = True
+            metrics.mark_startup("connected")
+            log.info("Consoles connected", extra={"consoles": list(self.consoles)})
+
+    async def close(self):
+        self._started = False
+        await asyncio.gather(*(console.close() for console in self.consoles.values()))
+
+    async def connect(self, console):
+        """Adds a console while the server is running and starts its connection."""
+        self.add(console)
+        if self._started:
+            try:
+                await console.start()
+            except OSError:
+                del self.consoles[console.name]
+                raise
+
+pool = ConsolePool(EOS_CONSOLES)
+
+_CONSOLE_PARAM = inspect.Parameter(
+    "console", inspect.Parameter.KEYWORD_ONLY, default=None,
+    annotation=Annotated[str | None, Field(
+        description='Console to use: a name, comma-separated names, or "all" (every live console). '
+                    'Defaults to the default console.')],
+)
+
+def console_tool(fn):
+    """
+    Registers fn as a tool with an optional `console` argument naming the
+    console(s) to run it against. For several consoles fn runs once per
+    console, concurrently, and the results are returned together, one
+    "[name] result" line per console. Inside fn, current() is the console it
+    is running for. Returns fn itself so it can still be called directly.
+    """
+    is_async = inspect.iscoroutinefunction(fn)
+
+    async def run(console, args, kwargs):
+        # Each gathered call runs in its own task, so this does not leak between consoles
+        _current_console.set(console)
+        if is_async:
+            return await fn(*args, **kwargs)
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    @functools.wraps(fn)
+    async def tool(*args, console=None, **kwargs):
+        try:
+            consoles = pool.select(console)
+        except ValueError as e:
+            return str(e)
+        if len(consoles) == 1:
+            return await run(consoles[0], args, kwargs)
+        results = await asyncio.gather(*(run(c, args, kwargs) for c in consoles), return_exceptions=True)
+        return "\n".join(
+            f"[{c.name}] {f'Error: {r}' if isinstance(r, Exception) else r}"
+            for c, r in zip(consoles, results)
+        )
+
+    signature = inspect.signature(fn)
+    tool.__signature__ = signature.replace(parameters=[*signature.parameters.values(), _CONSOLE_PARAM])
+    tool.__annotations__ = {**fn.__annotations__, "console": _CONSOLE_PARAM.annotation}
+    del tool.__wrapped__
+    mcp.tool()(tool)
+    return fn
+
+
+def handle_active_cue(list_num, cue_num, *args):
+    """
+    Handles /eos/out/active/cue/<list>/<cue> (float argument)
+    Example address: /eos/out/active/cue/1/5
+    """
+    percent = args[0] if args else 0.0
+
+    console = current()
+    console.state.update({
+        "active_cue_list": list_num,
+        "active_cue_number": cue_num,
+        "active_cue_percent": percent,
+    })
+    console.cue_progress.record(list_num, cue_num, percent)
+
+def handle_active_cue_text(*args):
+    """Handles /eos/out/active/cue/text (string argument)"""
+    if args:
+        current().state.set("active_cue_text", args[0])
+
+def handle_pending_cue(list_num, cue_num, *args):
+    """
+    Handles /eos/out/pending/cue/<list>/<cue>
+    """
+    current().state.update({
+        "pending_cue_list": list_num,
+        "pending_cue_number": cue_num,
+    })
+
+def handle_pending_cue_text(*args):
+    """Handles /eos/out/pending/cue/text (string argument)"""
+    if args:
+        current().state.set("pending_cue_text", args[0])
+
+def handle_live_blind(*args):
+    """Handles /eos/out/event/state (0=Blind, 1=Live)"""
+    if args:
+        current().state.set("live_blind_state", args[0])
+
+def handle_command_line(*args):
+    """Handles /eos/out/cmd and /eos/out/user/<num>/cmd"""
+    if args:
+        current().state.set("command_line", args[0])
+
+def handle_active_chan(*args):
+    """Handles /eos/out/active/chan (e.g. "12 [75] Source Four @ 75")"""
+    if args:
+        console = current()
+        console.state.set("active_channels", args[0])
+        console.channel_params.select(ChannelSet.parse(str(args[0])))
+
+def handle_active_wheel(wheel, *args):
+    """
+    Handles /eos/out/active/wheel/<n> (name, category, value), e.g.
+    ("Intens [50]", 1, 50.0), recording it for the selected channel.
+    """
+    params = current().channel_params
+    if len(args) < 3 or len(params.selected) != 1:
+        return
+    name = str(args[0]).split("[", 1)[0].strip() or f"wheel {wheel}"
+    params.update(next(iter(params.selected)), name, args[2], WHEEL_CATEGORIES.get(args[1], args[1]))
+
+def handle_fader_bank_label(bank, *args):
+    """Handles /eos/out/fader/<index> (bank label)"""
+    if args:
+        console = current()
+        console.fader_banks.set_bank_label(bank, args[0], console.state.next_seq)
+
+def handle_fader_level(bank, fader, *args):
+    """Handles /eos/out/fader/<index>/<fader> (level)"""
+    if args and isinstance(args[0], float):
+        console = current()
+        console.fader_banks.set_level(bank, fader, args[0], console.state.next_seq)
+
+def handle_fader_label(bank, fader, *args):
+    """Handles /eos/out/fader/<index>/<fader>/name"""
+    if args:
+        console = current()
+        console.fader_banks.set_label(bank, fader, args[0], console.state.next_seq)
+
+def handle_ds_bank_label(bank, *args):
+    """Handles /eos/out/ds/<index>"""
+    if args:
+        console = current()
+        console.ds_banks.set_bank_label(bank, args[0], console.state.next_seq)
+
+def handle_ds_button_label(bank, btn, *args):
+    """Handles /eos/out/ds/<index>/<button>"""
+    if args:
+        console = current()
+        console.ds_banks.set_label(bank, btn, args[0], console.state.next_seq)
+
+def handle_wheel_mode(*args):
+    if args: current().state.set(("wheels", "mode"), args[0])
+
+def handle_pantilt(*args):
+    current().state.set("pantilt", args)
+
+def handle_xyz(*args):
+    current().state.set("xyz", args)
+
+def _show_record(args):
+    """Builds a cache record from the arguments of a /eos/out/get/.../list/<index>/<count> reply."""
+    return {
+        "uid": args[1] if len(args) > 1 else None,
+        "label": args[2] if len(args) > 2 else "",
+        "data": list(args[3:]),
+    }
+
+def handle_cue_record(list_num, cue_num, part, index, count, *args):
+    """Handles /eos/out/get/cue/<list>/<cue>/<part>/list/<index>/<count>"""
+    number = f"{list_num}/{cue_num}" if part == 0 else f"{list_num}/{cue_num}/{part}"
+    current().show_cache.put("cue", number, _show_record(args))
+
+def handle_patch_record(chan, part, index, count, *args):
+    """Handles /eos/out/get/patch/<chan>/<part>/list/<index>/<count>"""
+    number = chan if part <= 1 else f"{chan}/{part}"
+    current().show_cache.put("patch", number, _show_record(args))
+
+def handle_show_record(target, number, index, count, *args):
+    """Handles /eos/out/get/<target>/<number>/list/<index>/<count> (groups, palettes, macros, subs, ...)"""
+    current().show_cache.put(target, number, _show_record(args))
+
+def handle_show_channels(target, number, index, count, *args):
+    """Handles /eos/out/get/<target>/<number>/channels/list/<index>/<count> (group and palette channels)"""
+    current().show_cache.set_channels(target, number, ChannelSet.parse(args[2:]))
+
+def _record_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def handle_notify(target, index, count, *args):
+    """
+    Handles /eos/out/notify/<target>/list/<index>/<count>
+    Arguments are the show file version followed by the changed record numbers.
+    """
+    if target in current().show_cache.synced and len(args) > 1:
+        spawn(refresh_records(target, [_record_number(v) for v in args[1:]]))
+
+def handle_cue_notify(list_num, index, count, *args):
+    """Handles /eos/out/notify/cue/<list>/list/<index>/<count>"""
+    if "cue" in current().show_cache.synced and len(args) > 1:
+        spawn(refresh_records(f"cue/{list_num}", [_record_number(v) for v in args[1:]]))
+
+def default_handler(address, *args):
+    pass
+
+def build_router(console=None):
+    """Builds the inbound router for a console (the current one by default)."""
+    console = console or current()
+    router = Router(console)
+    
+    router.map("/eos/out/active/cue/<str:list>/<str:cue>", handle_active_cue)
+    router.map("/eos/out/active/cue/text", handle_active_cue_text)
+    router.map("/eos/out/pending/cue/<str:list>/<str:cue>", handle_pending_cue)
+    router.map("/eos/out/pending/cue/text", handle_pending_cue_text)
+    
+    router.map("/eos/out/event/state", handle_live_blind)
+    router.map("/eos/out/cmd", handle_command_line)
+    router.map("/eos/out/user/*/cmd", handle_command_line)
+    router.map("/eos/out/active/chan", handle_active_chan)
+    router.map("/eos/out/active/wheel/<int:wheel>", handle_active_wheel)
+    router.map("/eos/out/wheel", handle_wheel_mode)
+    router.map("/eos/out/pantilt", handle_pantilt)
+    router.map("/eos/out/xyz", handle_xyz)
+
+    router.map("/eos/out/fader/<int:bank>", handle_fader_bank_label)
+    router.map("/eos/out/fader/<int:bank>/<int:fader>", handle_fader_level)
+    router.map("/eos/out/fader/<int:bank>/<int:fader>/name", handle_fader_label)
+
+    router.map("/eos/out/ds/<int:bank>", handle_ds_bank_label)
+    router.map("/eos/out/ds/<int:bank>/<int:button>", handle_ds_button_label)
+
+    router.map("/eos/out/get/cue/<str:list>/<str:cue>/<int:part>/list/<int:index>/<int:count>", handle_cue_record)
+    router.map("/eos/out/get/patch/<str:chan>/<int:part>/list/<int:index>/<int:count>", handle_patch_record)
+    router.map("/eos/out/get/<str:target>/<str:number>/list/<int:index>/<int:count>", handle_show_record)
+    router.map("/eos/out/get/<str:target>/<str:number>/channels/list/<int:index>/<int:count>", handle_show_channels)
+    router.map("/eos/out/notify/cue/<str:list>/list/<int:index>/<int:count>", handle_cue_notify)
+    router.map("/eos/out/notify/<str:target>/list/<int:index>/<int:count>", handle_notify)
+
+    router.set_default_handler(default_handler)
+    router.add_tap(console.replies.resolve)
+    router.add_tap(console.events.record)
+
+    return router
+
+async def start_async_osc_listener(console=None):
+    """
+    Binds a console's OSC listener as a datagram endpoint on the running event loop.
+    Packets are dispatched inline on the loop, so no thread is spawned per packet.
+    Returns the transport; close it to stop listening.
+    """
+    console = console or current()
+    loop = asyncio.get_running_loop()
+    server = osc_server.AsyncIOOSCUDPServer(("0.0.0.0", console.port_rx), build_router(console), loop)
+    transport, _ = await server.create_serve_endpoint()
+    log.info("Serving OSC listener", extra={"console": console.name, "port": console.port_rx})
+    return transport
+
+def start_osc_listener(console=None):
+    """Runs the thread-per-packet OSC listener. Blocks; run it on a thread."""
+    console = console or current()
+    server = osc_server.ThreadingOSCUDPServer(("0.0.0.0", console.port_rx), build_router(console))
+    log.info("Serving OSC listener", extra={"console": console.name, "port": console.port_rx})
+    server.serve_forever()
+
+# Capture files: CAPTURE_MAGIC, then per packet a little-endian
+# (time.monotonic_ns(), payload length) header followed by the raw datagram
+CAPTURE_MAGIC = b"EOSCAP1\n"
+_CAPTURE_RECORD = struct.Struct("<QI")
+
+def capture_path(path, directory=None):
+    """
+    Resolves a capture file name given to a tool to a path inside
+    EOS_CAPTURE_DIR. Raises ValueError for absolute paths, ".." components,
+    or names that resolve outside the directory (through a symlink).
+    """
+    directory = os.path.realpath(directory or EOS_CAPTURE_DIR)
+    parts = path.replace("\\", "/").split("/")
+    if not path or os.path.isabs(path) or os.path.splitdrive(path)[0] or ".." in parts:
+        raise ValueError(f"{path!r} is not a file name relative to the capture directory")
+    resolved = os.path.realpath(os.path.join(directory, path))
+    if os.path.commonpath([directory, resolved]) != directory or resolved == directory:
+        raise ValueError(f"{path!r} is not a file name relative to the capture directory")
+    return resolved
+
+class PacketCapture:
+    """
+    Appends every inbound datagram to a capture file. Writes go through a
+    64 KB buffer so recording costs one small copy per packet; the listener
+    never waits on the disk. Appending to an existing capture is allowed.
+    """
+
+    def __init__(self, path):
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+                    raise ValueError(f"{path} exists and is not a capture file")
+            self._file = open(path, "ab", buffering=1 << 16)
+        else:
+            self._file = open(path, "wb", buffering=1 << 16)
+            self._file.write(CAPTURE_MAGIC)
+        self.path = path
+        self.packets = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(_CAPTURE_RECORD.pack(time.monotonic_ns(), len(data)))
+            self._file.write(data)
+            self.packets += 1
+            self.bytes += len(data)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+def read_capture(path):
+    """
+    Yields (monotonic ns, datagram) for each packet in a capture file, read
+    through a memory map. A record cut short by an interrupted capture ends
+    the iteration. Raises ValueError if the file is not a capture.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = len(CAPTURE_MAGIC)
+            end = len(data)
+            header = _CAPTURE_RECORD.size
+            while offset + header <= end:
+                timestamp, length = _CAPTURE_RECORD.unpack_from(data, offset)
+                offset += header
+                if offset + length > end:
+                    return
+                yield timestamp, data[offset:offset + length]
+                offset += length
+
+async def replay_capture(path, router, speed=1.0):
+    """
+    Feeds a capture through router.call_handlers_for_packet, the same path
+    live packets take. speed 1 keeps the recorded timing, N plays N times
+    faster, 0 as fast as possible. Pacing is against the start time, so
+    sleep overshoot does not accumulate. Returns (packets, seconds).
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    elapsed_ns = 0
+    previous = None
+    packets = 0
+    for timestamp, datagram in read_capture(path):
+        if speed > 0:
+            if previous is not None:
+                # Captures appended after a reboot can go back in time; treat that as no gap
+                elapsed_ns += max(timestamp - previous, 0)
+            previous = timestamp
+            delay = start + elapsed_ns / 1e9 / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        router.call_handlers_for_packet(datagram, None)
+        packets += 1
+        if packets % 1024 == 0:
+            await asyncio.sleep(0)
+    return packets, loop.time() - start
+
+@console_tool
+def command_line(command: str) -> str:
+    """Sends a command to the ETC Nomad command line.
+    
+    Args:
+        command: The command string (e.g., "Chan 1 At 50").
+    """
+    address = "/eos/cmd"
+    send_message(address, command)
+    log_sent(address, command)
+    return f"Sent command: {command}"
+
+@console_tool
+def set_level(value: float) -> str:
+    """Sets the level of the currently selected channels (0-100)."""
+    address = "/eos/at"
+    send_message(address, value)
+    log_sent(address, value)
+    return f"Set level to {value}"
+
+@console_tool
+def set_level_mod(modification: str) -> str:
+    """Sets level variants.
+    
+    Args:
+        modification: "out", "home", "remdim", "level", "full", "min", "max", "+%", "-%".
+    """
+    address = f"/eos/at/{modification}"
+    send_message(address, [])
+    log_sent(address)
+    return f"Set level modification: {modification}"
+
+@console_tool
+def set_channel_mod(channel: int, modification: str) -> str:
+    """Sets level variants for a specific channel.
+    
+    Args:
+        channel: Channel number.
+        modification: "out", "home", "remdim", "level", "full", "min", "max", "+%", "-%".
+    """
+    address = f"/eos/chan/{channel}/{modification}"
+    send_message(address, [])
+    log_sent(address)
+    return f"Set Channel {channel} mod: {modification}"
+
+@console_tool
+def set_group_mod(group: int, modification: str) -> str:
+    """Sets level variants for a specific group.
+    
+    Args:
+        group: Group number.
+        modification: "out", "home", "remdim", "level", "full", "min", "max", "+%", "-%".
+    """
+    address = f"/eos/group/{group}/{modification}"
+    send_message(address, [])
+    log_sent(address)
+    return f"Set Group {group} mod: {modification}"
+
+@console_tool
+def set_parameter(param: str, value: float) -> str:
+    """Sets a specific parameter to a value.
+    
+    Args:
+        param: Parameter name (e.g., "pan", "tilt", "zoom").
+        value: Value to set.
+    """
+    address = f"/eos/param/{param}"
+    send_message(address, value)
+    log_sent(address, value)
+    return f"Set {param} to {value}"
+
+@console_tool
+def set_parameter_mod(param: str, modification: str) -> str:
+    """Sets parameter variants.
+    
+    Args:
+        param: Parameter name.
+        modification: "out", "home", "level", "full", "min", "max", "+%", "-%".
+    """
+    address = f"/eos/param/{param}/{modification}"
+    send_message(address, [])
+    log_sent(address)
+    return f"Set {param} modification: {modification}"
+
+@console_tool
+def set_dmx(address_num: int, value: int) -> str:
+    """Sets a DMX address to a level (0-255)."""
+    address = f"/eos/addr/{address_num}/DMX"
+    send_message(address, value)
+    # The next block write covering this address resends it
+    universe, slot = divmod(address_num - 1, DMX_UNIVERSE_SIZE)
+    after_send(current().dmx.forget, universe + 1, slot + 1)
+    log_sent(address, value)
+    return f"Set DMX address {address_num} to {value}"
+
+@console_tool
+def wheel_level(ticks: float) -> str:
+    """Adjusts the level wheel.
+    
+    Args:
+        ticks: Number of ticks (positive/negative). e.g. 1.0, -1.0.
+    """
+    address = "/eos/wheel/level"
+    if not send_paced(address, ticks, additive=True):
+        return "Could not adjust Level Wheel: outbound queue is full."
+    return f"Adjusted Level Wheel by {ticks}"
+
+@console_tool
+def wheel_parameter(param: str, ticks: float) -> str:
+    """Adjusts a parameter wheel.
+    
+    Args:
+        param: Parameter name (e.g. "pan").
+        ticks: Number of ticks.
+    """
+    address = f"/eos/wheel/{param}"
+    if not send_paced(address, ticks, additive=True):
+        return f"Could not adjust {param} Wheel: outbound queue is full."
+    return f"Adjusted {param} Wheel by {ticks}"
+
+@console_tool
+def switch_parameter(param: str, ticks: float) -> str:
+    """Sets switch mode for repeats.
+    
+    Args:
+        param: Parameter name.
+        ticks: Tick rate.
+    """
+    address = f"/eos/switch/{param}"
+    send_message(address, ticks)
+    log_sent(address, ticks)
+    return f"Set Switch {param} to {ticks}"
+
+@console_tool
+def set_xyz(x: float, y: float, z: float) -> str:
+    """Sets XYZ position."""
+    address = "/eos/xyz"
+    if not send_paced(address, [x, y, z]):
+        return "Could not set XYZ: outbound queue is full."
+    return f"Set XYZ to {x}, {y}, {z}"
+
+@console_tool
+def set_color_hs(hue: float, saturation: float) -> str:
+    """Sets color using Hue (0-360) and Saturation (0-100)."""
+    address = "/eos/color/hs"
+    send_message(address, [hue, saturation])
+    log_sent(address, hue, saturation)
+    return f"Set Color HS: {hue}, {saturation}"
+
+@console_tool
+def set_color_rgb(red: float, green: float, blue: float) -> str:
+    """Sets color using RGB values (0.0-1.0)."""
+    address = "/eos/color/rgb"
+    send_message(address, [red, green, blue])
+    log_sent(address, red, green, blue)
+    return f"Set Color RGB: {red}, {green}, {blue}"
+
+@console_tool
+def set_color_xy(x: float, y: float) -> str:
+    """Sets color using CIE xy coordinates (0.0-1.0)."""
+    address = "/eos/color/xy"
+    send_message(address, [x, y])
+    log_sent(address, x, y)
+    return f"Set Color XY: {x}, {y}"
+
+@console_tool
+def set_pan_tilt(pan: float, tilt: float) -> str:
+    """Sets Pan and Tilt (0.0-1.0 range usually maps to max range)."""
+    address = "/eos/pantilt/xy"
+    if not send_paced(address, [pan, tilt]):
+        return "Could not set Pan/Tilt: outbound queue is full."
+    return f"Set Pan/Tilt to {pan}, {tilt}"
+
+@console_tool
+def select_channel(channel: str) -> str:
+    """Selects a channel number (or range string)."""
+    address = "/eos/chan"
+    try:
+        val = int(channel)
+        send_message(address, val)
+    except ValueError:
+        return f"Invalid channel number: {channel}. Use command_line for ranges."
+    log_sent(address, channel)
+    return f"Selected Channel {channel}"
+
+@console_tool
+def select_group(group: int) -> str:
+    """Selects a group."""
+    address = "/eos/group"
+    send_message(address, group)
+    log_sent(address, group)
+    return f"Selected Group {group}"
+
+@console_tool
+def select_address_target(address_num: int) -> str:
+    """Selects an address (as a target)."""
+    address = "/eos/addr"
+    send_message(address, address_num)
+    log_sent(address, address_num)
+    return f"Selected Address {address_num}"
+
+@console_tool
+def select_curve(curve: int) -> str:
+    """Selects a curve."""
+    address = "/eos/curve"
+    send_message(address, curve)
+    log_sent(address, curve)
+    return f"Selected Curve {curve}"
+
+@console_tool
+def select_effect(effect: int) -> str:
+    """Selects an effect."""
+    address = "/eos/fx"
+    send_message(address, effect)
+    log_sent(address, effect)
+    return f"Selected Effect {effect}"
+
+@console_tool
+def select_pixel_map(pixmap: int) -> str:
+    """Selects a Pixel Map."""
+    address = "/eos/pixmap"
+    send_message(address, pixmap)
+    log_sent(address, pixmap)
+    return f"Selected Pixel Map {pixmap}"
+
+@console_tool
+def open_magic_sheet(ms: int) -> str:
+    """Opens a Magic Sheet."""
+    address = "/eos/ms"
+    send_message(address, ms)
+    log_sent(address, ms)
+    return f"Opened Magic Sheet {ms}"
+
+@console_tool
+def press_key(key_name: str) -> str:
+    """Presses and releases a hardkey (e.g., "Data", "About", "Go_To_Cue")."""
+    address = f"/eos/key/{key_name}"
+    send_message(address, 1.0)
+    send_message(address, 0.0)
+    log_sent(address, action="press")
+    return f"Pressed key {key_name}"
+
+@console_tool
+def fire_macro(macro: int) -> str:
+    """Fires a macro."""
+    address = "/eos/macro/fire"
+    send_message(address, macro)
+    log_sent(address, macro)
+    return f"Fired Macro {macro}"
+
+@console_tool
+def press_softkey(index: int) -> str:
+    """Presses a softkey (1-12)."""
+    address = f"/eos/softkey/{index}"
+    send_message(address, 1.0)
+    send_message(address, 0.0)
+    log_sent(address, action="press")
+    return f"Pressed Softkey {index}"
+
+@console_tool
+def fire_preset(preset: int) -> str:
+    """Fires (recalls) a preset."""
+    address = "/eos/preset/fire"
+    send_message(address, preset)
+    log_sent(address, preset)
     return f"Fired Preset {preset}"
 
-@mcp.tool()
+@console_tool
 def fire_palette(palette_type: str, number: int) -> str:
     """Fires a palette.
     
@@ -458,35 +2787,35 @@ def fire_palette(palette_type: str, number: int) -> str:
         return "Invalid palette type. Use intensity, focus, color, or beam."
     
     address = f"/eos/{pt}/fire"
-    client.send_message(address, number)
-    print(f"Sent: {address} {number}")
+    send_message(address, number)
+    log_sent(address, number)
     return f"Fired {palette_type} palette {number}"
 
-@mcp.tool()
+@console_tool
 def recall_snapshot(snapshot: int) -> str:
     """Recalls a snapshot."""
     address = "/eos/snap"
-    client.send_message(address, snapshot)
-    print(f"Sent: {address} {snapshot}")
+    send_message(address, snapshot)
+    log_sent(address, snapshot)
     return f"Recalled Snapshot {snapshot}"
 
-@mcp.tool()
+@console_tool
 def bump_sub(sub: int, level: float = 1.0) -> str:
     """Bumps a submaster to a level (default 1.0 / 100%)."""
     address = f"/eos/sub/{sub}/fire"
-    client.send_message(address, level)
-    print(f"Sent: {address} {level}")
+    send_message(address, level)
+    log_sent(address, level)
     return f"Bumped Sub {sub} to {level}"
 
-@mcp.tool()
+@console_tool
 def set_fader(bank: int, fader: int, level: float) -> str:
     """Sets a fader level (0.0-1.0)."""
     address = f"/eos/fader/{bank}/{fader}"
-    client.send_message(address, level)
-    print(f"Sent: {address} {level}")
+    if not send_paced(address, level):
+        return f"Could not set Fader {bank}/{fader}: outbound queue is full."
     return f"Set Fader {bank}/{fader} to {level}"
 
-@mcp.tool()
+@console_tool
 def control_fader_button(bank: int, fader: int, action: str) -> str:
     """Controls fader buttons.
     
@@ -496,196 +2825,1753 @@ def control_fader_button(bank: int, fader: int, action: str) -> str:
         action: "load", "unload", "stop", "fire".
     """
     address = f"/eos/fader/{bank}/{fader}/{action}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
+    send_message(address, [])
+    log_sent(address)
     return f"Fader {bank}/{fader} action: {action}"
 
-@mcp.tool()
+@console_tool
 def press_direct_select(bank: int, button: int) -> str:
     """Presses a direct select button."""
     address = f"/eos/ds/{bank}/{button}"
-    client.send_message(address, 1.0)
-    client.send_message(address, 0.0)
-    print(f"Sent DS Press: {bank}/{button}")
+    send_message(address, 1.0)
+    send_message(address, 0.0)
+    log_sent(address, action="press")
     return f"Pressed Direct Select {bank}/{button}"
 
-@mcp.tool()
+@console_tool
 def config_cue_list_bank(index: int, list_num: int, prev: int = 2, pending: int = 6) -> str:
     """Configures an OSC Cue List Bank."""
     address = f"/eos/cuelist/{index}/config/{list_num}/{prev}/{pending}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
+    send_message(address, [])
+    log_sent(address)
     return f"Configured Cue List Bank {index} for List {list_num}"
 
-@mcp.tool()
+@console_tool
 def page_cue_list_bank(index: int, delta: int) -> str:
     """Pages a Cue List Bank up or down."""
     address = f"/eos/cuelist/{index}/page/{delta}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
+    send_message(address, [])
+    log_sent(address)
     return f"Paged Cue List Bank {index} by {delta}"
 
-@mcp.tool()
+@console_tool
 def select_cue_list_bank_cue(index: int, cue: str) -> str:
     """Selects a cue in a Cue List Bank (jumps to it)."""
     address = f"/eos/cuelist/{index}/select/{cue}"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
+    send_message(address, [])
+    log_sent(address)
     return f"Cue List Bank {index} jump to cue {cue}"
 
-@mcp.tool()
+@console_tool
 def reset_cue_list_bank(index: int) -> str:
     """Resets a Cue List Bank."""
     address = f"/eos/cuelist/{index}/reset"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
+    send_message(address, [])
+    log_sent(address)
     return f"Reset Cue List Bank {index}"
 
 # --- Cues ---
 
-@mcp.tool()
+@console_tool
 def fire_cue(list_number: int, cue_number: str) -> str:
     """Fires a specific cue."""
     address = f"/eos/cue/{list_number}/{cue_number}/fire"
-    client.send_message(address, 1.0)
-    print(f"Sent: {address}")
+    after_send(current().cue_progress.trigger, time.monotonic())
+    send_message(address, 1.0)
+    log_sent(address)
     return f"Fired cue {cue_number} in list {list_number}"
 
-@mcp.tool()
+@console_tool
 def go_cue() -> str:
     """Presses the Go button for the master playback pair."""
     address = "/eos/key/go_0"
-    client.send_message(address, 1.0)
-    client.send_message(address, 0.0)
-    print(f"Sent Go")
+    after_send(current().cue_progress.trigger, time.monotonic())
+    send_message(address, 1.0)
+    send_message(address, 0.0)
+    log_sent(address, action="press")
     return "Pressed Go"
 
-@mcp.tool()
+@console_tool
 def stop_back_cue() -> str:
     """Presses the Stop/Back button."""
     address = "/eos/key/stop"
-    client.send_message(address, 1.0)
-    client.send_message(address, 0.0)
-    print(f"Sent Stop/Back")
+    send_message(address, 1.0)
+    send_message(address, 0.0)
+    log_sent(address, action="press")
     return "Pressed Stop/Back"
 
-@mcp.tool()
+# --- Batch ---
+
+BATCH_OPS = {
+    fn.__name__: fn for fn in (
+        command_line, set_level, set_level_mod, set_channel_mod, set_group_mod,
+        set_parameter, set_parameter_mod, set_dmx, wheel_level, wheel_parameter,
+        switch_parameter, set_xyz, set_color_hs, set_color_rgb, set_color_xy,
+        set_pan_tilt, select_channel, select_group, select_address_target,
+        select_curve, select_effect, select_pixel_map, open_magic_sheet,
+        press_key, fire_macro, press_softkey, fire_preset, fire_palette,
+        recall_snapshot, bump_sub, set_fader, control_fader_button,
+        press_direct_select, config_cue_list_bank, page_cue_list_bank,
+        select_cue_list_bank_cue, reset_cue_list_bank, fire_cue, go_cue,
+        stop_back_cue,
+    )
+}
+
+def _coerce_batch_arg(annotation, value):
+    """
+    Converts a batch argument to its parameter's type. Raises ValueError
+    rather than truncate: an int parameter only takes whole numbers (1.0,
+    "3"), so 1.7 cannot quietly address cue list or channel 1, and
+    numbers are never taken from bools.
+    """
+    if isinstance(value, bool) and annotation is not str:
+        raise ValueError(value)
+    if annotation is int:
+        if isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError(value)
+            return int(value)
+        if isinstance(value, str):
+            return int(value.strip())
+    return annotation(value)
+
+def _validate_batch_op(op):
+    """
+    Runs a single batch operation with sends queued.
+    Returns (PendingBatch, result); the PendingBatch is None if the operation is invalid.
+    """
+    if not isinstance(op, dict) or "op" not in op:
+        return None, "Operation must be an object with an 'op' field"
+    name = op["op"]
+    fn = BATCH_OPS.get(name)
+    if fn is None:
+        return None, f"Unknown operation: {name}"
+
+    kwargs = {k: v for k, v in op.items() if k != "op"}
+    sig = inspect.signature(fn)
+    try:
+        bound = sig.bind(**kwargs)
+    except TypeError as e:
+        return None, f"{name}: {e}"
+    for key, value in bound.arguments.items():
+        annotation = sig.parameters[key].annotation
+        if annotation in (int, float, str) and (not isinstance(value, annotation) or isinstance(value, bool)):
+            try:
+                bound.arguments[key] = _coerce_batch_arg(annotation, value)
+            except (TypeError, ValueError):
+                return None, f"{name}: {key} must be {annotation.__name__}, got {value!r}"
+
+    queued = PendingBatch()
+    token = _pending_batch.set(queued)
+    try:
+        result = fn(*bound.args, **bound.kwargs)
+    finally:
+        _pending_batch.reset(token)
+    if not queued.messages:
+        return None, f"{name}: {result}"
+    return queued, result
+
+@console_tool
+def batch(operations: list[dict]) -> str:
+    """Runs many operations in one call, sent to Eos as OSC bundles.
+
+    All operations are validated before anything is sent; if any is invalid,
+    nothing is sent.
+
+    Args:
+        operations: Ordered list of operations. Each is an object naming an
+            existing tool in "op" plus that tool's arguments, e.g.
+            {"op": "set_fader", "bank": 1, "fader": 2, "level": 0.5}.
+    """
+    queued = []
+    results = []
+    errors = []
+    for i, op in enumerate(operations, 1):
+        pending, result = _validate_batch_op(op)
+        if pending is None:
+            errors.append(f"  {i}. ERROR {result}")
+        else:
+            queued.append(pending)
+            results.append(f"  {i}. {result}")
+
+    if errors:
+        return "Batch rejected, nothing sent:\n" + "\n".join(errors)
+    if not queued:
+        return "Batch is empty, nothing sent."
+
+    messages = [msg for pending in queued for msg in pending.messages]
+    bundles = send_bundled(messages)
+    for pending in queued:
+        pending.sent()
+    log.info("Sent batch", extra={"ops": len(operations), "messages": len(messages), "bundles": bundles})
+    return (f"Sent {len(operations)} operations as {len(messages)} messages "
+            f"in {bundles} bundle(s):\n" + "\n".join(results))
+
+@console_tool
 def get_active_cue() -> str:
     """Returns the current active cue."""
-    if eos_state["active_cue_number"] is None:
+    state = current().state.snapshot()
+    if state["active_cue_number"] is None:
         return "No active cue data received yet."
-    return (f"Active Cue: {eos_state['active_cue_list']}/{eos_state['active_cue_number']} "
-            f"({eos_state['active_cue_percent']*100:.0f}%) "
-            f"Label: '{eos_state['active_cue_text']}'")
+    return (f"Active Cue: {state['active_cue_list']}/{state['active_cue_number']} "
+            f"({state['active_cue_percent']*100:.0f}%) "
+            f"Label: '{state['active_cue_text']}'")
+
+@console_tool
+def get_pending_cue() -> str:
+    """Returns the current pending cue."""
+    state = current().state.snapshot()
+    if state["pending_cue_number"] is None:
+        return "No pending cue data received yet."
+    return (f"Pending Cue: {state['pending_cue_list']}/{state['pending_cue_number']} "
+            f"Label: '{state['pending_cue_text']}'")
+
+def _cue_progress_line(key, fraction, superseded, waited):
+    if superseded:
+        return f"Cue {key[0]}/{key[1]} was replaced by another cue at {fraction*100:.0f}% after {waited:.2f}s."
+    return f"Cue {key[0]}/{key[1]} at {fraction*100:.0f}% after {waited:.2f}s."
+
+async def _wait_for_cue(future, timeout):
+    """Awaits a CueProgress.expect future; returns its result, or None on timeout."""
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return None
+
+@console_tool
+async def wait_for_cue(list_number: int, cue_number: str, percent: float = 100.0, timeout: float = 30.0) -> str:
+    """Waits until a cue's fade gets to a percentage (100 = complete), or another cue replaces it.
+
+    A run of the cue that had already got there counts only if it started
+    after the last fire_cue or Go sent by this server, so a previous run's
+    completion does not end the wait.
+
+    Args:
+        list_number: The cue list number.
+        cue_number: The cue number.
+        percent: Percent complete to wait for.
+        timeout: Maximum seconds to wait.
+    """
+    progress = current().cue_progress
+    key = (str(list_number), str(cue_number))
+    start = time.monotonic()
+    # A run that already got there counts only if it followed this server's last fire or Go
+    future = progress.expect(key, percent / 100, start if progress.triggered is None else progress.triggered)
+    try:
+        result = await _wait_for_cue(future, timeout)
+    finally:
+        progress.discard(future)
+    if result is None:
+        samples = progress.timeline(key)
+        reached = f" (at {samples[-1][1]*100:.0f}%)" if samples else " (no progress received)"
+        return f"Timed out after {timeout:.1f}s waiting for cue {key[0]}/{key[1]}{reached}."
+    return _cue_progress_line(*result, time.monotonic() - start)
+
+@console_tool
+async def go_and_wait(percent: float = 100.0, timeout: float = 30.0) -> str:
+    """Presses Go and waits until the cue it starts gets to a percentage (100 = complete).
+
+    Args:
+        percent: Percent complete to wait for.
+        timeout: Maximum seconds to wait, from pressing Go.
+    """
+    progress = current().cue_progress
+    start = time.monotonic()
+    # Registered before pressing Go so a fast console cannot start the cue unseen
+    started = progress.expect(None, 0.0)
+    try:
+        go_cue()
+        result = await _wait_for_cue(started, timeout)
+    finally:
+        progress.discard(started)
+    if result is None:
+        return f"Pressed Go, but no cue started within {timeout:.1f}s."
+    key = result[0]
+    future = progress.expect(key, percent / 100)
+    try:
+        result = await _wait_for_cue(future, max(timeout - (time.monotonic() - start), 0.0))
+    finally:
+        progress.discard(future)
+    if result is None:
+        samples = progress.timeline(key)
+        return (f"Pressed Go; cue {key[0]}/{key[1]} was at {samples[-1][1]*100:.0f}% "
+                f"when the {timeout:.1f}s timeout ran out.")
+    return "Pressed Go. " + _cue_progress_line(*result, time.monotonic() - start)
 
-@mcp.tool()
-def get_pending_cue() -> str:
-    """Returns the current pending cue."""
-    if eos_state["pending_cue_number"] is None:
-        return "No pending cue data received yet."
-    return (f"Pending Cue: {eos_state['pending_cue_list']}/{eos_state['pending_cue_number']} "
-            f"Label: '{eos_state['pending_cue_text']}'")
+@console_tool
+def get_cue_progress(list_number: int | None = None, cue_number: str | None = None) -> str:
+    """Returns a cue's fade progress timeline and estimated time to completion, as JSON.
 
-@mcp.tool()
+    Args:
+        list_number: The cue list number. Defaults, with cue_number, to the active cue.
+        cue_number: The cue number.
+    """
+    progress = current().cue_progress
+    key = progress.active if list_number is None or cue_number is None else (str(list_number), str(cue_number))
+    samples = progress.timeline(key) if key else []
+    if not samples:
+        return "No cue progress received yet." if key is None else f"No progress received for cue {key[0]}/{key[1]}."
+    start = samples[0][0]
+    eta = progress.eta(key)
+    return json.dumps({
+        "list": key[0],
+        "cue": key[1],
+        "active": key == progress.active,
+        "percent": round(samples[-1][1] * 100, 2),
+        "elapsed_s": round(samples[-1][0] - start, 3),
+        "eta_s": None if eta is None else round(eta, 3),
+        "samples": [[round(t - start, 3), round(f * 100, 2)] for t, f in samples],
+    })
+
+@console_tool
 def get_live_blind_state() -> str:
     """Returns current Live/Blind state."""
-    state = "Live" if eos_state["live_blind_state"] == 1 else "Blind"
-    return f"Console State: {state}"
+    mode = "Live" if current().state.snapshot()["live_blind_state"] == 1 else "Blind"
+    return f"Console State: {mode}"
 
-@mcp.tool()
+@console_tool
 def request_setup() -> str:
     """Requests setup info."""
     address = "/eos/get/setup"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
+    send_message(address, [])
+    log_sent(address)
     return "Requested setup info."
 
-@mcp.tool()
+@console_tool
 def reset_osc() -> str:
     """Resets OSC connections."""
     address = "/eos/reset"
-    client.send_message(address, [])
-    print(f"Sent: {address}")
+    send_message(address, [])
+    log_sent(address)
     return "Sent OSC Reset"
 
-@mcp.tool()
+@console_tool
 def get_command_line() -> str:
     """Returns the current command line text."""
-    return f"Command Line: {eos_state['command_line']}"
+    return f"Command Line: {current().state.snapshot()['command_line']}"
 
-@mcp.tool()
+# Most ranges listed when a tool prints a channel set
+CHANNEL_LIST_MAX_RANGES = 200
+
+def _format_channels(channels):
+    intervals = channels.intervals()
+    if not intervals:
+        return "none"
+    if len(intervals) <= CHANNEL_LIST_MAX_RANGES:
+        return str(channels)
+    shown = ChannelSet(intervals[:CHANNEL_LIST_MAX_RANGES])
+    return f"{shown}, ... ({len(intervals) - CHANNEL_LIST_MAX_RANGES} more ranges)"
+
+def _channel_operand(group, channels):
+    """
+    Returns (ChannelSet, description) for a group from the synced show data,
+    or for channel numbers and ranges. Raises ValueError if neither is usable.
+    """
+    if group is not None:
+        cache = current().show_cache
+        if cache.get("group", str(group)) is None:
+            raise ValueError(f"Group {group} is not cached. Run sync_show first.")
+        return cache.channels("group", str(group)), f"group {group}"
+    if channels:
+        return ChannelSet.parse(channels), "the given channels"
+    raise ValueError("Give a group or channels.")
+
+@console_tool
 def get_selection() -> str:
     """Returns the current active channel selection."""
-    return f"Selected Channels: {eos_state['active_channels']}"
+    console = current()
+    selected = console.channel_params.selected
+    return (f"Selected Channels: {console.state.snapshot()['active_channels']}\n"
+            f"{len(selected)} channels: {_format_channels(selected)}")
 
-@mcp.tool()
+@console_tool
+def selection_size() -> str:
+    """Returns how many channels are selected."""
+    selected = current().channel_params.selected
+    return f"{len(selected)} channels selected in {len(selected.intervals())} range(s)."
+
+@console_tool
+def selection_contains(channels: list[str]) -> str:
+    """Checks which of the given channels are in the active selection.
+
+    Args:
+        channels: Channel numbers or ranges, e.g. ["1-10", "15"].
+    """
+    wanted = ChannelSet.parse(channels)
+    if not wanted:
+        return "No channels given."
+    selected = current().channel_params.selected
+    inside = wanted & selected
+    if inside == wanted:
+        return f"All {len(wanted)} channels are selected."
+    if not inside:
+        return f"None of the {len(wanted)} channels are selected."
+    return (f"Selected ({len(inside)}): {_format_channels(inside)}\n"
+            f"Not selected ({len(wanted) - len(inside)}): {_format_channels(wanted - selected)}")
+
+@console_tool
+def selection_intersection(group: str | None = None, channels: list[str] | None = None) -> str:
+    """Returns the selected channels that are also in a group or a list of channels.
+
+    Args:
+        group: Group number, from the synced show data.
+        channels: Channel numbers or ranges, e.g. ["1-10", "15"], if no group is given.
+    """
+    try:
+        other, name = _channel_operand(group, channels)
+    except ValueError as e:
+        return str(e)
+    result = current().channel_params.selected & other
+    return f"{len(result)} selected channels in {name}: {_format_channels(result)}"
+
+@console_tool
+def selection_difference(group: str | None = None, channels: list[str] | None = None) -> str:
+    """Returns the selected channels that are not in a group or a list of channels.
+
+    Args:
+        group: Group number, from the synced show data.
+        channels: Channel numbers or ranges, e.g. ["1-10", "15"], if no group is given.
+    """
+    try:
+        other, name = _channel_operand(group, channels)
+    except ValueError as e:
+        return str(e)
+    result = current().channel_params.selected - other
+    return f"{len(result)} selected channels not in {name}: {_format_channels(result)}"
+
+@console_tool
 def get_faders(bank: int) -> str:
     """Returns the status of faders in a specific bank (1-based)."""
-    if bank not in eos_state["faders"]:
+    table = current().fader_banks
+    if bank not in table:
         return f"No data for Fader Bank {bank}"
     
-    data = eos_state["faders"][bank]
-    bank_info = f"Bank {bank} ({data['bank_label']}):\n"
-    fader_info = []
-    for f_idx, f_data in data["faders"].items():
-        fader_info.append(f"  Fader {f_idx}: {f_data['label']} = {f_data['level']:.2f}")
+    bank_info = f"Bank {bank} ({table.bank_label(bank)}):\n"
+    fader_info = [f"  Fader {f_idx}: {label} = {level:.2f}"
+                  for f_idx, label, level in table.entries(bank)]
     
     if not fader_info: return bank_info + "  No faders populated."
     return bank_info + "\n".join(fader_info)
 
-@mcp.tool()
+@console_tool
 def get_direct_selects(bank: int) -> str:
     """Returns the status of a Direct Select bank (1-based)."""
-    if bank not in eos_state["direct_selects"]:
+    table = current().ds_banks
+    if bank not in table:
         return f"No data for DS Bank {bank}"
     
-    data = eos_state["direct_selects"][bank]
-    bank_info = f"DS Bank {bank} ({data['label']}):\n"
-    btn_info = []
-    for btn_idx, label in data["buttons"].items():
-        btn_info.append(f"  Btn {btn_idx}: {label}")
+    bank_info = f"DS Bank {bank} ({table.bank_label(bank)}):\n"
+    btn_info = [f"  Btn {btn_idx}: {label}" for btn_idx, label, _ in table.entries(bank)]
     
     if not btn_info: return bank_info + "  No buttons populated."
     return bank_info + "\n".join(btn_info)
 
-@mcp.tool()
+@console_tool
 def get_system_state() -> str:
     """Returns aggregate system state information."""
-    state_str = "Live" if eos_state["live_blind_state"] == 1 else "Blind"
-    wheel_mode = eos_state["wheels"].get("mode", "Unknown")
+    state = current().state.snapshot()
+    state_str = "Live" if state["live_blind_state"] == 1 else "Blind"
+    wheel_mode = state["wheels"].get("mode", "Unknown")
     
     info = [
         f"Console State: {state_str}",
         f"Wheel Mode: {wheel_mode}",
     ]
-    if eos_state["pantilt"]:
-        info.append(f"Pan/Tilt: {eos_state['pantilt']}")
-    if eos_state["xyz"]:
-        info.append(f"XYZ: {eos_state['xyz']}")
-    
+    if state["pantilt"]:
+        info.append(f"Pan/Tilt: {list(state['pantilt'])}")
+    if state["xyz"]:
+        info.append(f"XYZ: {list(state['xyz'])}")
+
     return "\n".join(info)
 
+@console_tool
+def get_outbound_stats() -> str:
+    """Returns counters for paced continuous-control traffic (faders, wheels, pan/tilt, xyz)."""
+    outbound = current().outbound
+    stats = outbound.stats()
+    return (f"Outbound: {stats['submitted']} submitted, {stats['coalesced']} coalesced, "
+            f"{stats['sent']} sent, {stats['dropped']} dropped, {stats['pending']} pending "
+            f"(frame {outbound.frame * 1000:.0f} ms, {outbound.rate:.0f} pkt/s, burst {outbound.burst})")
+
+def metrics_json():
+    outbound = {name: console.outbound.stats() for name, console in pool.consoles.items()}
+    generators = {name: console.generators.stats() for name, console in pool.consoles.items()}
+    return json.dumps(dict(metrics.snapshot(), outbound=outbound, generators=generators))
+
 @mcp.tool()
-def sync_state() -> str:
+def get_metrics(reset: bool = False) -> str:
+    """
+    Returns server metrics as JSON: OSC packet and byte counters in each
+    direction, per-tool call latency, per-handler time for inbound messages
+    (count, mean and p50/p90/p99/max in ms), each console's outbound pacing
+    counters, and its generator frame counters (frames skipped for lack of
+    outbound budget, and frames that sent only part of their changes).
+
+    Args:
+        reset: Clear the counters and histograms after reading them.
+    """
+    result = metrics_json()
+    if reset:
+        metrics.reset()
+    return result
+
+@mcp.resource("eos://metrics")
+def metrics_resource() -> str:
+    """Server metrics as JSON (see get_metrics)."""
+    return metrics_json()
+
+def bank_state(table, fader_form, banks=None, since=None):
+    """
+    Serializes a fader (fader_form) or direct select BankTable for the
+    requested banks (default all with data) as {bank: {"bank_label" or
+    "label": ..., "faders" or "buttons": {index: ...}}}, holding only
+    entries changed after since if given.
+    """
+    wanted = table.banks() if banks is None else [b for b in banks if b in table]
+    result = {}
+    if since is None:
+        for bank in wanted:
+            entries = table.entries(bank)
+            if fader_form:
+                result[bank] = {"bank_label": table.bank_label(bank),
+                                "faders": {i: {"level": level, "label": label} for i, label, level in entries}}
+            else:
+                result[bank] = {"label": table.bank_label(bank),
+                                "buttons": {i: label for i, label, _ in entries}}
+        return result
+    wanted = set(wanted)
+    for _, bank, index, label, level in sorted(table.changes(since)):
+        if bank not in wanted:
+            continue
+        entry = result.setdefault(bank, {})
+        if index == 0:
+            entry["bank_label" if fader_form else "label"] = label
+        elif fader_form:
+            entry.setdefault("faders", {})[index] = {"level": level, "label": label}
+        else:
+            entry.setdefault("buttons", {})[index] = label
+    return result
+
+def _state_paths(path, value, paths):
+    """Adds each leaf of a nested dict to paths as {path tuple: value}."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _state_paths(path + (key,), item, paths)
+    else:
+        paths[path] = value
+
+# Structured field name -> state key, or {output key: state key}
+STATE_FIELDS = {
+    "active_cue": {"list": "active_cue_list", "number": "active_cue_number",
+                   "percent": "active_cue_percent", "text": "active_cue_text"},
+    "pending_cue": {"list": "pending_cue_list", "number": "pending_cue_number",
+                    "text": "pending_cue_text"},
+    "live_blind": "live_blind_state",
+    "command_line": "command_line",
+    "selection": "active_channels",
+    "wheels": "wheels",
+    "pantilt": "pantilt",
+    "xyz": "xyz",
+}
+BANK_FIELDS = ("faders", "direct_selects")
+
+@console_tool
+def get_state(fields: list[str] | None = None, faders: list[int] | None = None,
+              direct_selects: list[int] | None = None, since_version: int | None = None) -> str:
+    """Returns the console state as JSON in one call.
+
+    Args:
+        fields: Any of "active_cue", "pending_cue", "live_blind", "command_line",
+            "selection", "wheels", "pantilt", "xyz", "faders", "direct_selects".
+            Defaults to all.
+        faders: Fader banks to include (default all with data).
+        direct_selects: Direct select banks to include (default all with data).
+        since_version: "version" from a previous call; only fields that changed
+            since are returned. Falls back to the full state ("full": true) if
+            that version is too old or ahead of the server's.
+    """
+    fields = fields or list(STATE_FIELDS) + list(BANK_FIELDS)
+    unknown = [f for f in fields if f not in STATE_FIELDS and f not in BANK_FIELDS]
+    if unknown:
+        return json.dumps({"error": f"Unknown fields: {', '.join(unknown)}",
+                           "fields": list(STATE_FIELDS) + list(BANK_FIELDS)})
+
+    console = current()
+    version, state = console.state.versioned_snapshot()
+    changed = None
+    if since_version is not None:
+        _, changes = console.state.delta(since_version)
+        if changes is not None:
+            changed = {path[0] for path in changes}
+    since = since_version if changed is not None else None
+
+    result = {"version": version, "full": since is None}
+    for field in fields:
+        if field in BANK_FIELDS:
+            table, banks = (console.fader_banks, faders) if field == "faders" else (console.ds_banks, direct_selects)
+            entries = bank_state(table, field == "faders", banks, since)
+            if since is None or entries:
+                result[field] = entries
+            continue
+        keys = STATE_FIELDS[field]
+        if isinstance(keys, str):
+            if changed is None or keys in changed:
+                result[field] = state[keys]
+        elif changed is None or changed.intersection(keys.values()):
+            result[field] = {name: state[key] for name, key in keys.items()}
+    return json.dumps(result)
+
+@console_tool
+def get_state_delta(since_seq: int = 0) -> str:
+    """Returns what changed in the console state since a sequence number, as JSON.
+
+    Pass the "seq" from the previous response to get only newer changes. If
+    since_seq is 0, too old to diff against, or ahead of the server's (it
+    restarted since), the full state is returned with "full": true instead.
+
+    Args:
+        since_seq: Sequence number from a previous call.
+    """
+    console = current()
+    store = console.state
+    seq, changes = store.delta(since_seq)
+    if since_seq <= 0 or changes is None:
+        seq, state = store.versioned_snapshot()
+        state = dict(state, faders=bank_state(console.fader_banks, True),
+                     direct_selects=bank_state(console.ds_banks, False))
+        return json.dumps({"seq": seq, "full": True, "state": state})
+    _state_paths(("faders",), bank_state(console.fader_banks, True, since=since_seq), changes)
+    _state_paths(("direct_selects",), bank_state(console.ds_banks, False, since=since_seq), changes)
+    return json.dumps({
+        "seq": seq,
+        "full": False,
+        "changes": [{"path": list(path), "value": value} for path, value in changes.items()],
+    })
+
+async def _sync_query(address, reply):
+    try:
+        await query(address, [], reply)
+        return None
+    except asyncio.TimeoutError:
+        return address
+
+@console_tool
+async def sync_state() -> str:
     """
-    Forces Eos to re-send all current status information.
+    Forces Eos to re-send all current status information and waits for the replies.
     STRONGLY RECOMMENDED: Call this tool immediately upon startup to populate the state.
     """
-    client.send_message("/eos/get/cue/active", [])
-    client.send_message("/eos/get/cue/pending", [])
-    
-    client.send_message("/eos/get/version", [])
-    client.send_message("/eos/get/cmd", [])
-    client.send_message("/eos/get/setup", [])
+    user = current().user
+    # Eos reports an OSC user's command line on that user's address
+    command_reply = "/eos/out/cmd" if user is None else f"/eos/out/user/{user}/cmd"
+    requests = [
+        ("/eos/get/cue/active", "/eos/out/active/cue"),
+        ("/eos/get/cue/pending", "/eos/out/pending/cue"),
+        ("/eos/get/version", "/eos/out/get/version"),
+        ("/eos/get/cmd", command_reply),
+        ("/eos/get/setup", "/eos/out/get/setup"),
+        # Fader banks 0 and 1
+        ("/eos/fader/0/config", "/eos/out/fader/0"),
+        ("/eos/fader/1/config", "/eos/out/fader/1"),
+        # Direct selects bank 1
+        ("/eos/ds/1/config", "/eos/out/ds/1"),
+    ]
+    missing = [m for m in await asyncio.gather(*(_sync_query(a, r) for a, r in requests)) if m]
 
-    # Request fader banks (0, 1, 2)
-    client.send_message("/eos/fader/0/config", []) 
-    client.send_message("/eos/fader/1/config", []) 
-    
-    # Request direct selects bank 1
-    client.send_message("/eos/ds/1/config", [])
-    
-    return "Synchronization requests sent to Eos."
+    if len(missing) == len(requests):
+        return "No reply from Eos. Check that OSC RX/TX are enabled and the ports match."
+    if missing:
+        return (f"State synchronized ({len(requests) - len(missing)}/{len(requests)} replies). "
+                f"No reply to: {', '.join(missing)}")
+    return "State synchronized."
+
+@console_tool
+async def get_version() -> str:
+    """Asks the console for its software version."""
+    try:
+        _, args = await query("/eos/get/version", [], "/eos/out/get/version")
+    except asyncio.TimeoutError:
+        return "No reply from Eos."
+    return f"Eos Version: {args[0] if args else 'Unknown'}"
+
+@console_tool
+async def get_count(target: str) -> str:
+    """Asks the console how many records of a type the show contains.
+
+    Args:
+        target: "cue", "patch", "group", "macro", "sub", "preset", "ip", "fp", "cp", "bp", ...
+    """
+    try:
+        _, args = await query(f"/eos/get/{target}/count", [], f"/eos/out/get/{target}/count")
+    except asyncio.TimeoutError:
+        return f"No reply from Eos for {target} count."
+    return f"{target} count: {args[0] if args else 0}"
+
+# --- Sequences ---
+
+# Frames per second at which ramps are interpolated and sent
+SEQUENCE_FRAME_RATE = 40.0
+# Longest sequence and most scheduled sends accepted from one run_sequence call
+SEQUENCE_MAX_DURATION = 3600.0
+SEQUENCE_MAX_EVENTS = 100_000
+# Finished sequences kept for sequence_status
+SEQUENCE_HISTORY = 32
+# Upper bound on how early the scheduler wakes to cancel out timer overshoot
+SEQUENCE_MAX_LEAD = 0.002
+
+def _ramp_endpoints(op, index):
+    """
+    Compiles a ramp step at its "from" and target values. Returns the two
+    PendingBatches or raises ValueError if their messages do not differ
+    only in numeric OSC arguments.
+    """
+    start = {k: v for k, v in op.items() if k not in ("from", "over", "at")}
+    end = dict(start)
+    if not isinstance(op.get("from"), dict) or not op["from"]:
+        raise ValueError(f"{index}. ramp needs a 'from' object of starting argument values")
+    start.update(op["from"])
+    first, result = _validate_batch_op(start)
+    last, result_end = _validate_batch_op(end)
+    if first is None or last is None:
+        raise ValueError(f"{index}. {result if first is None else result_end}")
+    shapes_match = len(first.messages) == len(last.messages) and all(
+        a.address == b.address and len(a.params) == len(b.params) for a, b in zip(first.messages, last.messages))
+    if not shapes_match:
+        raise ValueError(f"{index}. {op['op']} cannot be ramped: start and end send different messages")
+    for a, b in zip(first.messages, last.messages):
+        for x, y in zip(a.params, b.params):
+            numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (x, y))
+            if x != y and not numeric:
+                raise ValueError(f"{index}. {op['op']} cannot be ramped: {x!r} -> {y!r} is not numeric")
+    return first, last
+
+def _interpolate(first, last, fraction):
+    """Builds the messages a fraction of the way from first to last."""
+    messages = []
+    for a, b in zip(first, last):
+        params = []
+        for x, y in zip(a.params, b.params):
+            if x != y:
+                x = x + (y - x) * fraction
+                x = round(x) if isinstance(y, int) else float(x)
+            params.append(x)
+        messages.append(build_message(a.address, params))
+    return messages
+
+def compile_sequence(steps, frame_rate=SEQUENCE_FRAME_RATE):
+    """
+    Turns sequence steps into a time-ordered event list of
+    (seconds from start, step number, PendingBatch or ramp). Steps start where
+    the previous step's time cursor is (or at "at"); {"op": "wait",
+    "seconds": s} moves the cursor; a step with "over" and "from" ramps
+    from the "from" argument values to its own over that many seconds,
+    one event per frame, without moving the cursor. Ramp events carry
+    (start time, duration, start PendingBatch, end PendingBatch) and are
+    interpolated when sent. Nothing is logged or applied until an event is
+    sent. Raises ValueError listing every invalid step.
+    """
+    events = []
+    errors = []
+    cursor = 0.0
+    for i, op in enumerate(steps, 1):
+        if not isinstance(op, dict) or "op" not in op:
+            errors.append(f"{i}. step must be an object with an 'op' field")
+            continue
+        try:
+            if "at" in op:
+                cursor = float(op["at"])
+            if op["op"] == "wait":
+                cursor += float(op.get("seconds", 0.0))
+                continue
+            if "over" in op:
+                over = float(op["over"])
+                first, last = _ramp_endpoints(op, i)
+                frames = max(math.ceil(over * frame_rate), 1)
+                ramp = (cursor, over, first, last)
+                events.extend((cursor + over * n / frames, i, ramp) for n in range(frames + 1))
+                end = cursor + over
+            else:
+                pending, result = _validate_batch_op(op)
+                if pending is None:
+                    raise ValueError(f"{i}. {result}")
+                events.append((cursor, i, pending))
+                end = cursor
+        except (TypeError, ValueError) as e:
+            errors.append(str(e) if str(e).startswith(f"{i}.") else f"{i}. {e}")
+            continue
+        if cursor < 0 or end > SEQUENCE_MAX_DURATION:
+            errors.append(f"{i}. times must be between 0 and {SEQUENCE_MAX_DURATION:.0f}s")
+    if len(events) > SEQUENCE_MAX_EVENTS:
+        errors.append(f"sequence has {len(events)} sends, more than {SEQUENCE_MAX_EVENTS}")
+    if errors:
+        raise ValueError("\n".join(errors))
+    events.sort(key=lambda e: e[0])
+    return events
+
+class Sequence:
+    """
+    One run of a compiled sequence on a console, as an asyncio task.
+
+    Each event is scheduled against the monotonic start time, so timer
+    error never accumulates from step to step. The scheduler wakes early by
+    a running estimate of the loop's timer overshoot (at most
+    SEQUENCE_MAX_LEAD) to center its error on zero. Ramp frames are
+    interpolated for the time they are actually sent; a ramp frame whose
+    successor is already due is skipped rather than sent late. Timing error
+    of every send is kept in a Histogram.
+    """
+
+    def __init__(self, sequence_id, name, console, events):
+        self.id = sequence_id
+        self.name = name
+        self.console = console
+        self.events = events
+        self.duration = events[-1][0] if events else 0.0
+        self.state = "pending"
+        self.error = None
+        self.sent = 0
+        self.skipped = 0
+        self.step = 0
+        self.started = None
+        self.finished = None
+        self.timing = Histogram()
+        self.early = 0
+        self._task = None
+
+    def start(self):
+        self._task = spawn(self._run())
+
+    def cancel(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            return True
+        return False
+
+    async def _run(self):
+        _current_console.set(self.console)
+        self.state = "running"
+        lead = 0.0
+        start = self.started = time.monotonic()
+        events = self.events
+        try:
+            for n, (at, step, payload) in enumerate(events):
+                target = start + at
+                delay = target - time.monotonic() - lead
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                now = time.monotonic()
+                if isinstance(payload, tuple):
+                    following = events[n + 1] if n + 1 < len(events) else None
+                    if following is not None and following[2] is payload and start + following[0] <= now:
+                        self.skipped += 1
+                        continue
+                    ramp_start, over, first, last = payload
+                    fraction = min(max((now - start - ramp_start) / over, 0.0), 1.0) if over > 0 else 1.0
+                    messages = _interpolate(first.messages, last.messages, fraction)
+                    send_bundled(messages)
+                    last.sent(logged=False)
+                    for msg in messages:
+                        log_sent(msg.address, *msg.params, sequence=self.id)
+                else:
+                    send_bundled(payload.messages)
+                    payload.sent()
+                error = now - target
+                if error < 0:
+                    self.early += 1
+                self.timing.observe(abs(error))
+                # Exponentially weighted timer overshoot, used as the next wake-up lead
+                lead = min(max(lead + 0.1 * error, 0.0), SEQUENCE_MAX_LEAD)
+                self.sent += 1
+                self.step = step
+            self.state = "done"
+        except asyncio.CancelledError:
+            self.state = "cancelled"
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            log.exception("Sequence failed", extra={"sequence": self.id})
+        finally:
+            self.finished = time.monotonic()
+            if self.timing.count:
+                metrics.observe("sequences", "timing_error", self.timing.total / self.timing.count)
+            log.info("Sequence %s", self.state, extra={"sequence": self.id, "sent": self.sent, "skipped": self.skipped})
+
+    def status(self):
+        now = self.finished or time.monotonic()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "console": self.console.name,
+            "state": self.state,
+            "step": self.step,
+            "elapsed_s": round(now - self.started, 3) if self.started else 0.0,
+            "duration_s": round(self.duration, 3),
+            "sent": self.sent,
+            "skipped_frames": self.skipped,
+            "early": self.early,
+            "timing_error": self.timing.summary(),
+            **({"error": self.error} if self.error else {}),
+        }
+
+_sequences = collections.OrderedDict()
+_sequence_ids = itertools.count(1)
+
+def _forget_finished_sequences():
+    finished = [s for s in _sequences.values() if s.state not in ("pending", "running")]
+    for sequence in finished[:max(len(finished) - SEQUENCE_HISTORY, 0)]:
+        del _sequences[sequence.id]
+
+@console_tool
+async def run_sequence(steps: list[dict], name: str = "", frame_rate: float = SEQUENCE_FRAME_RATE) -> str:
+    """Runs a timed sequence of operations on the server, without a round trip per step.
+
+    All steps are validated before anything runs. Sequences run concurrently
+    with each other and with other tools; use sequence_status and
+    cancel_sequence with the returned id.
+
+    Args:
+        steps: Ordered steps. Each names an existing tool in "op" plus its
+            arguments, as in batch, and runs where the previous step left the
+            time cursor, or at "at" seconds from the start.
+            {"op": "wait", "seconds": 2.5} moves the cursor on. A step with
+            "over" (seconds) and "from" (starting argument values) ramps those
+            arguments to the step's values and does not move the cursor, e.g.
+            [{"op": "fire_cue", "list_number": 1, "cue_number": "5"},
+             {"op": "wait", "seconds": 2.5},
+             {"op": "bump_sub", "sub": 3},
+             {"op": "set_fader", "bank": 1, "fader": 2, "level": 1.0, "from": {"level": 0.0}, "over": 4}]
+        name: Optional label shown in sequence_status.
+        frame_rate: Frames per second for ramps.
+    """
+    if not 0 < frame_rate <= 1000:
+        return "frame_rate must be between 0 and 1000."
+    try:
+        events = compile_sequence(steps, frame_rate)
+    except ValueError as e:
+        return f"Sequence rejected, nothing sent:\n{e}"
+    if not events:
+        return "Sequence is empty, nothing sent."
+    sequence = Sequence(next(_sequence_ids), name, current(), events)
+    _forget_finished_sequences()
+    _sequences[sequence.id] = sequence
+    sequence.start()
+    log.info("Started sequence", extra={"sequence": sequence.id, "steps": len(steps), "sends": len(events)})
+    return (f"Started sequence {sequence.id}{f' ({name})' if name else ''}: "
+            f"{len(events)} sends over {sequence.duration:.2f}s.")
+
+@mcp.tool()
+def sequence_status(sequence_id: int | None = None) -> str:
+    """Returns the progress and timing accuracy of one sequence, or of all recent ones, as JSON.
+
+    Args:
+        sequence_id: The id returned by run_sequence. Defaults to every running and recent sequence.
+    """
+    if sequence_id is not None:
+        sequence = _sequences.get(sequence_id)
+        if sequence is None:
+            return f"Unknown sequence {sequence_id}."
+        return json.dumps(sequence.status())
+    return json.dumps([sequence.status() for sequence in _sequences.values()])
+
+@mcp.tool()
+def cancel_sequence(sequence_id: int | None = None) -> str:
+    """Cancels a running sequence, or every running sequence.
+
+    Args:
+        sequence_id: The id returned by run_sequence. Defaults to all.
+    """
+    if sequence_id is not None:
+        sequence = _sequences.get(sequence_id)
+        if sequence is None:
+            return f"Unknown sequence {sequence_id}."
+        return f"Cancelled sequence {sequence_id}." if sequence.cancel() else f"Sequence {sequence_id} is not running."
+    cancelled = [s.id for s in _sequences.values() if s.cancel()]
+    return f"Cancelled sequences: {', '.join(map(str, cancelled))}." if cancelled else "No sequences running."
+
+# --- Generators ---
+
+_generator_ids = itertools.count(1)
+
+@console_tool
+async def start_generator(targets: list[str], param: str = "intens", waveform: str = "sine",
+                    rate: float = 0.5, low: float = 0.0, high: float = 100.0,
+                    spread: float = 1.0, bank: int = 1) -> str:
+    """Starts a waveform generator that drives a parameter across many channels or faders every frame.
+
+    Only values that changed since the last frame are sent, bundled. Several
+    generators can run at once (e.g. a pan sine and a tilt sine a quarter
+    cycle apart).
+
+    Args:
+        targets: Channel numbers or ranges, e.g. ["1-48", "101"]; fader numbers when param is "fader".
+        param: Channel parameter to drive ("intens", "pan", "tilt", "hue", ...), or "fader" for faders in bank.
+        waveform: "sine", "triangle", "saw", "square", or "chase" (one target lit at a time).
+        rate: Cycles per second.
+        low: Output at the bottom of the wave.
+        high: Output at the top of the wave (faders are 0.0-1.0, hue 0-360).
+        spread: Phase offset in cycles across all targets; 0 moves them together.
+        bank: Fader bank, for param "fader".
+    """
+    if waveform not in WAVEFORMS:
+        return f"Unknown waveform '{waveform}'. Use one of: {', '.join(WAVEFORMS)}."
+    numbers = list(ChannelSet.parse(targets))
+    if not numbers:
+        return "No targets given."
+    if len(numbers) > GENERATOR_MAX_TARGETS:
+        return f"Too many targets ({len(numbers)}); the limit is {GENERATOR_MAX_TARGETS}."
+    console = current()
+    if param == "fader":
+        addresses = [console.command_address(f"/eos/fader/{bank}/{n}") for n in numbers]
+        label = f"fader bank {bank}"
+    else:
+        addresses = [console.command_address(f"/eos/chan/{n}/param/{param}") for n in numbers]
+        label = param
+    generator = Generator(next(_generator_ids), waveform, label, addresses, rate, low, high, spread)
+    console.generators.add(generator)
+    log.info("Started generator", extra=generator.status())
+    return (f"Started generator {generator.id}: {waveform} on {label} of {len(numbers)} "
+            f"{'faders' if param == 'fader' else 'channels'} at {rate} Hz, "
+            f"{console.generators.frame_rate:.0f} frames/s.")
+
+@console_tool
+async def stop_generator(generator_id: int | None = None) -> str:
+    """Stops a generator, or all generators. Targets keep their last values.
+
+    Args:
+        generator_id: The id returned by start_generator. Defaults to all.
+    """
+    stopped = current().generators.remove(generator_id)
+    if not stopped:
+        return "No generators running." if generator_id is None else f"No generator {generator_id}."
+    return f"Stopped generator{'s' if len(stopped) > 1 else ''} {', '.join(map(str, stopped))}."
+
+@console_tool
+def list_generators() -> str:
+    """Returns the running generators and frame statistics (frame time, dropped frames) as JSON."""
+    return json.dumps(current().generators.status())
+
+# --- DMX ---
+
+def _dmx_payload(values, data):
+    """Returns the DMX levels given as a list of 0-255 values or base64 data. Raises ValueError."""
+    if data is not None:
+        try:
+            return base64.b64decode(data, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("data is not valid base64")
+    if values is None:
+        raise ValueError("Give values or data.")
+    try:
+        return bytes(values)
+    except (TypeError, ValueError):
+        raise ValueError("values must be integers from 0 to 255")
+
+def write_dmx_block(universe, start, payload, force=False):
+    """
+    Sends the addresses of a DMX block that differ from the current
+    console's shadow, bundled. Returns (changed, bundles).
+    """
+    console = current()
+    changed = console.dmx.diff(universe, start, payload, force)
+    offset = (universe - 1) * DMX_UNIVERSE_SIZE
+    elements = [(osc_element_head(console.command_address(f"/eos/addr/{offset + slot}/DMX"), "i"), _pack_int(value))
+                for slot, value in changed]
+    bundles = pack_bundles(elements)
+    console.outbound.flush_ahead()
+    for bundle in bundles:
+        console.transmit(bundle)
+        console.outbound.charge()
+    return len(changed), len(bundles)
+
+@console_tool
+def set_dmx_block(start: int, values: list[int] | None = None, data: str | None = None,
+                  universe: int = 1, force: bool = False) -> str:
+    """Sets a block of consecutive DMX addresses, sending only those that changed since the last block write.
+
+    Args:
+        start: First address in the universe (1-512).
+        values: Levels (0-255) for start, start+1, ...
+        data: The levels as base64-encoded bytes instead of values, for large blocks.
+        universe: DMX universe.
+        force: Send every address, even if unchanged.
+    """
+    try:
+        payload = _dmx_payload(values, data)
+    except ValueError as e:
+        return str(e)
+    if not 1 <= universe <= DMX_MAX_UNIVERSE:
+        return f"Universe must be 1-{DMX_MAX_UNIVERSE}."
+    if not payload or start < 1 or start + len(payload) - 1 > DMX_UNIVERSE_SIZE:
+        return f"The block must have at least one value and fit in addresses 1-{DMX_UNIVERSE_SIZE}."
+    changed, bundles = write_dmx_block(universe, start, payload, force)
+    log.info("Sent DMX block", extra={"universe": universe, "start": start, "slots": len(payload), "changed": changed})
+    return (f"Universe {universe}, addresses {start}-{start + len(payload) - 1}: "
+            f"{changed} of {len(payload)} changed, sent in {bundles} bundle(s).")
+
+@console_tool
+def set_universe(universe: int, values: list[int] | None = None, data: str | None = None, force: bool = False) -> str:
+    """Sets a whole DMX universe from address 1, sending only the addresses that changed.
+
+    Args:
+        universe: DMX universe.
+        values: Up to 512 levels (0-255), from address 1.
+        data: The levels as base64-encoded bytes instead of values.
+        force: Send every address, even if unchanged.
+    """
+    return set_dmx_block(1, values, data, universe, force)
+
+# --- Show Data ---
+
+SHOW_TARGETS = ("patch", "cue", "group", "preset", "ip", "fp", "cp", "bp", "macro", "sub")
+# Index requests kept in flight at once during a show sync
+SHOW_SYNC_WINDOW = 64
+SHOW_SYNC_RETRIES = 3
+SHOW_SYNC_TIMEOUT = 1.0
+
+async def _fetch_count(target):
+    """Returns the record count for a target (e.g. "group", "cue/1"), or None if Eos never answers."""
+    for _ in range(SHOW_SYNC_RETRIES):
+        try:
+            _, args = await query(f"/eos/get/{target}/count", [], f"/eos/out/get/{target}/count",
+                                  SHOW_SYNC_TIMEOUT)
+            return int(args[0]) if args else 0
+        except asyncio.TimeoutError:
+            pass
+    return None
+
+async def _fetch_records(jobs, on_progress=None):
+    """
+    Requests every (target, index) in jobs with at most SHOW_SYNC_WINDOW
+    requests in flight, retrying lost replies. Records are stored by the
+    reply handlers. Returns the jobs that never got a reply.
+    """
+    pending = iter(jobs)
+    failed = []
+
+    async def worker():
+        for target, index in pending:
+            for _ in range(SHOW_SYNC_RETRIES):
+                try:
+                    await query(f"/eos/get/{target}/index/{index}", [], f"/eos/out/get/{target}",
+                                SHOW_SYNC_TIMEOUT, index=index)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                failed.append((target, index))
+            if on_progress is not None:
+                await on_progress()
+
+    await asyncio.gather(*(worker() for _ in range(min(SHOW_SYNC_WINDOW, len(jobs)))))
+    return failed
+
+async def sync_show_data(targets=SHOW_TARGETS, ctx=None):
+    """
+    Downloads show records for targets into the console's show cache: fetches all counts,
+    then the records in windowed parallel batches. Cues are fetched per cue
+    list once the cue lists are known. Returns (counts, missing) where missing
+    lists the targets or (target, index) requests that got no reply.
+    """
+    targets = list(targets)
+    if "cue" in targets:
+        targets[targets.index("cue")] = "cuelist"
+    done = 0
+    total = 0
+
+    async def on_progress():
+        nonlocal done
+        done += 1
+        if ctx is not None and (done % 100 == 0 or done == total):
+            await ctx.report_progress(done, total)
+
+    async def fetch(targets):
+        nonlocal total
+        counts = dict(zip(targets, await asyncio.gather(*(_fetch_count(t) for t in targets))))
+        missing = [t for t, count in counts.items() if count is None]
+        jobs = [(t, i) for t, count in counts.items() if count for i in range(count)]
+        total += len(jobs)
+        missing += await _fetch_records(jobs, on_progress)
+        return counts, missing
+
+    cache = current().show_cache
+    for target in targets:
+        cache.clear(target)
+        if target == "cuelist":
+            cache.clear("cue")
+    counts, missing = await fetch(targets)
+    cache.synced.update(t for t in targets if counts[t] is not None)
+
+    if "cuelist" in targets:
+        cue_lists = [f"cue/{num}" for num in cache.records("cuelist")]
+        if cue_lists:
+            cue_counts, cue_missing = await fetch(cue_lists)
+            counts.update(cue_counts)
+            missing += cue_missing
+        if counts["cuelist"] is not None:
+            cache.synced.add("cue")
+    return counts, missing
+
+def _cache_key(target, number):
+    """Maps a console target and record number to the show cache key ("cue/1", "5" -> "cue", "1/5")."""
+    if target.startswith("cue/"):
+        return "cue", f"{target[4:]}/{number}"
+    return target, number
+
+async def _reconcile_target(target):
+    """
+    Lists every record of target (e.g. "group", "cue/1") by index and drops
+    the cached records the listing no longer contains. Returns False,
+    removing nothing, if the count or any record went unanswered.
+    """
+    cache = current().show_cache
+    kind, prefix = _cache_key(target, "")
+    before = {number: record for number, record in cache.records(kind).items() if number.startswith(prefix)}
+    count = await _fetch_count(target)
+    if count is None or await _fetch_records([(target, i) for i in range(count)]):
+        return False
+    after = cache.records(kind)
+    for number, record in before.items():
+        # Every listed record was written again, replacing the cached object
+        if after.get(number) is record:
+            cache.remove(kind, number)
+    return True
+
+async def refresh_records(target, numbers):
+    """
+    Re-fetches records the console reported as changed. A record that does
+    not answer may have been deleted or its replies lost, so it is marked
+    stale and the target is re-listed by index; it is dropped only if that
+    complete listing no longer contains it.
+    """
+    async def refresh(number):
+        for _ in range(SHOW_SYNC_RETRIES):
+            try:
+                await query(f"/eos/get/{target}/{number}", [], f"/eos/out/get/{target}/{number}",
+                            SHOW_SYNC_TIMEOUT)
+                return None
+            except asyncio.TimeoutError:
+                pass
+        return number
+
+    cache = current().show_cache
+    unanswered = [n for n in await asyncio.gather(*(refresh(number) for number in numbers)) if n is not None]
+    if not unanswered:
+        return
+    for number in unanswered:
+        cache.mark_stale(*_cache_key(target, number))
+    if not await _reconcile_target(target):
+        log.warning("Could not confirm changed show records; kept them as stale",
+                    extra={"target": target, "records": unanswered})
+
+@console_tool
+async def sync_show(targets: list[str] | None = None, ctx: Context = None) -> str:
+    """Downloads show data from the console into the local cache.
+
+    Args:
+        targets: Record types to fetch. Defaults to all of "patch", "cue",
+            "group", "preset", "ip", "fp", "cp", "bp", "macro", "sub".
+    """
+    targets = targets or SHOW_TARGETS
+    unknown = [t for t in targets if t not in SHOW_TARGETS]
+    if unknown:
+        return f"Unknown targets: {', '.join(unknown)}. Use {', '.join(SHOW_TARGETS)}."
+
+    start = time.perf_counter()
+    counts, missing = await sync_show_data(targets, ctx)
+    elapsed = time.perf_counter() - start
+
+    cached = current().show_cache.counts()
+    lines = [f"Synced show data in {elapsed:.1f}s:"]
+    for target, count in counts.items():
+        if count is not None:
+            lines.append(f"  {target}: {count}")
+    lines.append("Cached: " + ", ".join(f"{t} {n}" for t, n in sorted(cached.items())))
+    if missing:
+        shown = ", ".join(t if isinstance(t, str) else f"{t[0]} index {t[1]}" for t in missing[:20])
+        more = f" (+{len(missing) - 20} more)" if len(missing) > 20 else ""
+        lines.append(f"No reply for: {shown}{more}")
+    return "\n".join(lines)
+
+def _describe_record(target, number):
+    cache = current().show_cache
+    record = cache.get(target, number) or {}
+    stale = " (stale)" if (target, number) in cache.stale else ""
+    return f"  {target} {number}: {record.get('label', '')}{stale}"
+
+@console_tool
+def find_by_label(text: str, target: str | None = None) -> str:
+    """Searches the synced show data for records whose label contains text.
+
+    Args:
+        text: Words to look for (case-insensitive).
+        target: Optionally restrict to one record type, e.g. "cue", "group", "cp".
+    """
+    found = current().show_cache.find_label(text, target)
+    if not found:
+        return f"No records labelled '{text}'. Run sync_show first if the show is not cached."
+    return f"Found {len(found)} record(s):\n" + "\n".join(_describe_record(t, n) for t, n in found)
+
+@console_tool
+def find_channel_membership(channel: int) -> str:
+    """Lists the groups and palettes in the synced show data that contain a channel."""
+    found = current().show_cache.containing_channel(channel)
+    if not found:
+        return f"Channel {channel} is not in any cached group or palette."
+    return f"Channel {channel} is in:\n" + "\n".join(_describe_record(t, n) for t, n in found)
+
+@console_tool
+def get_cue_list(list_number: int, start: int = 0, limit: int = 50) -> str:
+    """Lists the cues of a cue list in order from the synced show data.
+
+    Args:
+        list_number: Cue list number.
+        start: Position of the first cue to return.
+        limit: Maximum number of cues to return.
+    """
+    cues = current().show_cache.cue_list(list_number)
+    if not cues:
+        return f"No cached cues for list {list_number}. Run sync_show first."
+    page = cues[start:start + limit]
+    lines = [f"Cue List {list_number} ({len(cues)} cues), {start + 1}-{start + len(page)}:"]
+    lines += [_describe_record("cue", number) for number in page]
+    return "\n".join(lines)
+
+# --- Channel Levels ---
+
+# Longest string sent to /eos/newcmd in one message
+COMMAND_MAX_LENGTH = 255
+
+def _run_text(first, last):
+    if first == last:
+        return str(first)
+    if last == first + 1:
+        return f"{first} + {last}"
+    return f"{first} Thru {last}"
+
+def _gap_text(first, last):
+    if first == last:
+        return str(first)
+    if last == first + 1:
+        return f"{first} - {last}"
+    return f"{first} Thru {last}"
+
+def channel_selection(channels, max_length=COMMAND_MAX_LENGTH):
+    """
+    Compresses channel numbers into the parts of an Eos selection, to be
+    joined with " + ": consecutive runs become "a Thru b", and runs with
+    short gaps between them merge into "a Thru b - x" when that is shorter.
+    No part is longer than max_length. E.g. 1-10 except 5, and 20 ->
+    ["1 Thru 10 - 5", "20"]. Linear after the sort.
+    """
+    numbers = sorted(set(channels))
+    runs = []
+    for ch in numbers:
+        if runs and ch == runs[-1][1] + 1:
+            runs[-1][1] = ch
+        else:
+            runs.append([ch, ch])
+    # Spans are [first, last, gap texts, length of " - gap" texts]
+    spans = []
+    for first, last in runs:
+        if spans:
+            span = spans[-1]
+            start, end, gaps, gaps_length = span
+            span_length = len(f"{start} Thru {end}") + gaps_length if gaps else len(_run_text(start, end))
+            gap = " - " + _gap_text(end + 1, first - 1)
+            merged = len(f"{start} Thru {last}") + gaps_length + len(gap)
+            if merged < span_length + 3 + len(_run_text(first, last)) and merged <= max_length:
+                gaps.append(gap)
+                span[1] = last
+                span[3] += len(gap)
+                continue
+        spans.append([first, last, [], 0])
+    return [f"{start} Thru {end}" + "".join(gaps) if gaps else _run_text(start, end)
+            for start, end, gaps, _ in spans]
+
+def selection_commands(channels, max_length=COMMAND_MAX_LENGTH):
+    """
+    Splits the terminated selection command for channels into strings no
+    longer than max_length: the first ("Chan ...") starts a new command
+    line and the rest (" + ...") are appended to it, the last ending in "#".
+    """
+    parts = channel_selection(channels, max_length - len("Chan #"))
+    commands = ["Chan " + parts[0]]
+    for part in parts[1:]:
+        text = " + " + part
+        if len(commands[-1]) + len(text) < max_length:
+            commands[-1] += text
+        else:
+            commands.append(text)
+    commands[-1] += "#"
+    return commands
+
+def level_text(level):
+    """Formats an intensity for the command line. Single digits are zero padded, since Eos reads "At 5" as 50%."""
+    value = round(level, 2)
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" + text if value < 10 else text
+
+def compile_level_commands(levels, max_length=COMMAND_MAX_LENGTH):
+    """
+    Compiles {channel: level} into as few command strings as possible, none
+    longer than max_length. Channels are grouped by level, each group
+    becomes "Chan <selection> At <level>#" (split if too long), and the
+    instructions are packed into strings in order.
+    """
+    groups = collections.defaultdict(list)
+    for channel, level in levels.items():
+        groups[level].append(channel)
+    instructions = []
+    for level in sorted(groups):
+        suffix = f" At {level_text(level)}#"
+        room = max_length - len("Chan ") - len(suffix)
+        chunk = []
+        size = 0
+        for part in channel_selection(groups[level], room):
+            added = len(part) + (3 if chunk else 0)
+            if chunk and size + added > room:
+                instructions.append("Chan " + " + ".join(chunk) + suffix)
+                chunk = []
+                size = 0
+                added = len(part)
+            chunk.append(part)
+            size += added
+        instructions.append("Chan " + " + ".join(chunk) + suffix)
+    commands = []
+    for instruction in instructions:
+        if commands and len(commands[-1]) + len(instruction) <= max_length:
+            commands[-1] += instruction
+        else:
+            commands.append(instruction)
+    return commands
+
+@console_tool
+def set_levels(levels: dict[int, float]) -> str:
+    """Sets many channels to their own intensities with as few command lines as possible.
+
+    Channels with equal levels are grouped and ranges compressed
+    (e.g. "Chan 1 Thru 100 - 50 At 75#").
+
+    Args:
+        levels: Intensity (0-100) per channel number, e.g. {"1": 50, "2": 50, "3": 75}.
+    """
+    invalid = [ch for ch, level in levels.items() if ch < 1 or not 0 <= level <= 100]
+    if invalid:
+        return f"Levels must be 0-100 for channel numbers of at least 1; invalid: {', '.join(map(str, invalid[:10]))}"
+    if not levels:
+        return "No levels given."
+    commands = compile_level_commands(levels)
+    address = "/eos/newcmd"
+    for command in commands:
+        send_message(address, command)
+    log_sent(address, channels=len(levels), commands=len(commands))
+    summary = f"Set {len(levels)} channels to {len(set(levels.values()))} levels in {len(commands)} command(s)"
+    if len(commands) > 5:
+        return summary + "."
+    return summary + ":\n" + "\n".join(commands)
+
+# --- Channel Parameters ---
+
+# Seconds after which cached channel parameters are considered stale
+CHANNEL_PARAMS_MAX_AGE = 30.0
+# Seconds to wait for the console to report the parameters of selected channels
+CHANNEL_FETCH_TIMEOUT = 1.0
+
+async def _await_channel_params(channels, since, timeout):
+    """Waits until every channel has parameters newer than since; returns the ones that never arrived."""
+    console = current()
+    params = console.channel_params
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    seq = console.events.seq
+    pending = channels
+    while True:
+        pending = [ch for ch in pending if not params.updated_since(ch, since)]
+        remaining = deadline - loop.time()
+        if not pending or remaining <= 0:
+            return pending
+        events, _ = await console.events.wait(seq, ["active_wheel"], remaining)
+        if events:
+            seq = events[-1].seq
+
+async def fetch_channel_params(channels, timeout=CHANNEL_FETCH_TIMEOUT):
+    """
+    Gets fresh parameters for channels by selecting each one in turn, all
+    in one bundle, and collecting the wheel output Eos sends back. Channels
+    that did not report are retried one at a time. The previous channel
+    selection, as last reported by Eos, is restored afterwards (or cleared if
+    nothing was selected); anything typed on the command line is lost.
+    Returns the channels that never reported.
+    """
+    console = current()
+    previous = sorted(console.channel_params.selected)
+    address = console.command_address("/eos/chan")
+    started = time.monotonic()
+    send_bundled([build_message(address, ch) for ch in channels])
+    missing = await _await_channel_params(channels, started, timeout)
+    for ch in list(missing):
+        started = time.monotonic()
+        send_message("/eos/chan", ch)
+        if not await _await_channel_params([ch], started, timeout):
+            missing.remove(ch)
+    if previous:
+        commands = selection_commands(previous)
+        restore = [build_message(console.command_address("/eos/newcmd"), commands[0])]
+        restore += [build_message(console.command_address("/eos/cmd"), command) for command in commands[1:]]
+    else:
+        # The first Clear empties the command line; Clear on an empty line deselects
+        key = console.command_address("/eos/key/clear_cmdline")
+        restore = [build_message(key, value) for value in (1.0, 0.0, 1.0, 0.0)]
+    send_bundled(restore)
+    return missing
+
+@console_tool
+async def get_channel_params(channels: list[int], max_age: float = CHANNEL_PARAMS_MAX_AGE,
+                             fetch: bool = False) -> str:
+    """Returns the parameter values (intensity, focus, color, ...) of channels as JSON.
+
+    Values come from a cache fed by the console's wheel output; by default
+    only the cache is read, and missing or old values are marked stale.
+
+    With fetch=true, channels with no cached values or values older than
+    max_age are fetched from the console by selecting them on its command
+    line. This OVERWRITES THE OPERATOR'S COMMAND LINE (anything typed there
+    is lost) and changes the selection while it runs; the selection Eos last
+    reported is restored afterwards. Only fetch when nobody is working on
+    the console's command line.
+
+    Args:
+        channels: Channel numbers.
+        max_age: Seconds after which cached values are stale (and re-fetched with fetch=true).
+        fetch: Fetch stale channels from the console, replacing its command line and selection.
+    """
+    console = current()
+    stale = console.channel_params.stale(channels, max_age)
+    missing = await fetch_channel_params(stale) if stale and fetch else []
+    result = {}
+    for ch in channels:
+        entry = console.channel_params.get(ch)
+        if entry is None:
+            result[ch] = None
+            continue
+        age, params = entry
+        result[ch] = {
+            "age_s": round(age, 3),
+            "stale": age > max_age,
+            "params": {name: {"value": value, "category": category}
+                       for name, (value, category) in params.items()},
+        }
+    return json.dumps({"channels": result, "fetched": [ch for ch in stale if ch not in missing] if fetch else [],
+                       "missing": missing})
+
+# --- Events ---
+
+@console_tool
+async def wait_for_events(since: int | None = None, filters: list[str] | None = None,
+                          timeout: float = 30.0) -> str:
+    """Waits for console events (cue changes, fader moves, command line, ...) and returns them as JSON.
+
+    Returns as soon as a matching event is available, or with an empty list
+    after the timeout. Pass the returned "seq" as `since` on the next call.
+
+    Args:
+        since: Sequence number of the last event seen. Omit to wait for new events only.
+        filters: Event types (e.g. "active_cue", "fader_level", "command_line",
+            "active_chan") or OSC address prefixes such as "/eos/out/fader/1".
+        timeout: Maximum seconds to wait.
+    """
+    events_log = current().events
+    if since is None:
+        since = events_log.seq
+    events, dropped = await events_log.wait(since, filters, timeout)
+    seq = events[-1].seq if events else since
+    return events_json(events, dropped, seq)
+
+def _recent_events(console, event_type=None):
+    events, dropped = console.events.since(0, [event_type] if event_type else None)
+    return events_json(events, dropped, console.events.seq)
+
+@mcp.resource("eos://events")
+def recent_events() -> str:
+    """Recent events from the default console as JSON."""
+    return _recent_events(pool.default)
+
+@mcp.resource("eos://events/{event_type}")
+def recent_events_of_type(event_type: str) -> str:
+    """Recent events of one type from the default console as JSON."""
+    return _recent_events(pool.default, event_type)
+
+@mcp.resource("eos://consoles/{console}/events")
+def recent_console_events(console: str) -> str:
+    """Recent events from a named console as JSON."""
+    return _recent_events(pool.select(console)[0])
+
+@mcp.resource("eos://consoles/{console}/events/{event_type}")
+def recent_console_events_of_type(console: str, event_type: str) -> str:
+    """Recent events of one type from a named console as JSON."""
+    return _recent_events(pool.select(console)[0], event_type)
+
+# (session id, console name) -> task pushing resource-updated notifications
+_event_subscriptions = {}
+
+def _events_uri(filters, console):
+    """The events resource a subscription's notifications point at."""
+    base = "eos://events" if console is pool.default else f"eos://consoles/{console.name}/events"
+    if filters and len(filters) == 1 and not filters[0].startswith("/"):
+        return f"{base}/{filters[0]}"
+    return base
+
+async def _push_event_updates(key, session, filters, console):
+    """Notifies session of matching events until cancelled or a notification cannot be sent."""
+    since = console.events.seq
+    uri = _events_uri(filters, console)
+    try:
+        while True:
+            events, _ = await console.events.wait(since, filters, timeout=60.0)
+            if events:
+                since = events[-1].seq
+                await session.send_resource_updated(uri)
+    except Exception as e:
+        log.info("Ended event subscription", extra={"console": console.name, "error": str(e)})
+    finally:
+        if _event_subscriptions.get(key) is asyncio.current_task():
+            del _event_subscriptions[key]
+
+@console_tool
+async def subscribe_events(filters: list[str] | None = None, ctx: Context = None) -> str:
+    """Sends this client a resource-updated notification whenever matching events arrive.
+
+    Args:
+        filters: Event types or OSC address prefixes, as for wait_for_events.
+    """
+    console = current()
+    session_id = ctx.session_id
+    unsubscribe_session(session_id, console.name)
+    key = (session_id, console.name)
+    _event_subscriptions[key] = spawn(_push_event_updates(key, ctx.session, filters, console))
+    # Cancel the session's subscriptions when its connection closes
+    connection = getattr(ctx.session, "_connection", None)
+    if connection is not None and not connection.state.get("eos_unsubscribe"):
+        connection.state["eos_unsubscribe"] = True
+        connection.exit_stack.callback(unsubscribe_session, session_id)
+    return f"Subscribed. Read {_events_uri(filters, console)} when notified."
+
+def unsubscribe_session(session_id, console_name=None):
+    """Cancels a session's subscriptions, on one console or on all of them."""
+    for key in [k for k in _event_subscriptions if k[0] == session_id]:
+        if console_name is None or key[1] == console_name:
+            _event_subscriptions.pop(key).cancel()
+
+@console_tool
+def unsubscribe_events(ctx: Context = None) -> str:
+    """Stops event notifications started by subscribe_events."""
+    unsubscribe_session(ctx.session_id, current().name)
+    return "Unsubscribed."
+
+# --- Capture and Replay ---
+
+@console_tool
+def start_capture(path: str) -> str:
+    """Starts recording every inbound OSC packet from the console to a capture file.
+
+    Args:
+        path: File to write, relative to the capture directory (EOS_CAPTURE_DIR).
+            An existing capture file is appended to.
+    """
+    console = current()
+    if console.capture is not None:
+        return f"Already capturing to {console.capture.path}."
+    try:
+        resolved = capture_path(path)
+        os.makedirs(os.path.dirname(resolved), exist_ok=True)
+        console.capture = PacketCapture(resolved)
+    except (OSError, ValueError) as e:
+        return f"Could not start capture: {e}"
+    return f"Capturing inbound OSC to {resolved}."
+
+@console_tool
+def stop_capture() -> str:
+    """Stops the capture started by start_capture."""
+    console = current()
+    capture = console.capture
+    if capture is None:
+        return "Not capturing."
+    console.capture = None
+    capture.close()
+    return f"Stopped capture: {capture.packets} packets ({capture.bytes} bytes) in {capture.path}."
+
+@mcp.tool()
+async def replay(path: str, speed: float = 0.0, into: str = "replay") -> str:
+    """Replays a capture file through the inbound OSC dispatch path, rebuilding console state from it.
+
+    Packets go into an offline console (created if needed) so the live
+    consoles are untouched; inspect the result by passing its name as the
+    `console` argument of other tools.
+
+    Args:
+        path: Capture file written by start_capture, relative to the capture directory.
+        speed: 1 for the recorded timing, N for N times faster, 0 for as fast as possible.
+        into: New or offline console to replay into; live consoles are refused.
+    """
+    try:
+        resolved = capture_path(path)
+    except ValueError as e:
+        return f"Could not replay {path}: {e}"
+    console = pool.consoles.get(into)
+    if console is None:
+        console = Console(into, transport="offline")
+        pool.add(console)
+    elif console.transport != "offline":
+        return f"Console '{into}' is a live console; replay into a new or offline console instead."
+    if console.capture is not None:
+        return f"Console '{into}' is being captured; stop the capture before replaying into it."
+    try:
+        packets, seconds = await replay_capture(resolved, build_router(console), speed)
+    except (OSError, ValueError) as e:
+        return f"Could not replay {path}: {e}"
+    rate = f" ({packets / seconds:.0f} packets/s)" if seconds > 0 else ""
+    return f"Replayed {packets} packets into '{into}' in {seconds:.2f}s{rate}."
+
+# --- Consoles ---
+
+@mcp.tool()
+def list_consoles() -> str:
+    """Lists the configured console connections. Use their names as the `console` argument of other tools."""
+    lines = []
+    for name, console in pool.consoles.items():
+        if console.transport == "tcp":
+            link = f"tcp {console.host}:{console.port_tx}"
+            link += "" if console.client.connected else " (disconnected)"
+        elif console.transport == "offline":
+            link = "offline"
+        else:
+            link = f"udp {console.host}:{console.port_tx}, listening on {console.port_rx}"
+        user = f", user {console.user}" if console.user is not None else ""
+        default = " (default)" if console is pool.default else ""
+        lines.append(f"{name}{default}: {link}{user}")
+    return "\n".join(lines)
+
+@mcp.tool()
+async def add_console(name: str, host: str, port_tx: int = EOS_PORT_TX, port_rx: int = EOS_PORT_RX,
+                      transport: str = "udp", user: int | None = None) -> str:
+    """Connects to another console (or the same console as another OSC user) under a new name.
+
+    Args:
+        name: Name to address the console by in the `console` argument of other tools.
+        host: Console IP address.
+        port_tx: Port the console receives OSC on (for "tcp", its OSC TCP port).
+        port_rx: Local port to listen on for this console's replies; must be unused.
+        transport: "udp" or "tcp".
+        user: Send commands as this Eos OSC user.
+    """
+    if transport not in ("udp", "tcp"):
+        return f"Unknown transport '{transport}'. Use 'udp' or 'tcp'."
+    options = {"port_tcp": port_tx} if transport == "tcp" else {"port_tx": port_tx}
+    try:
+        await pool.connect(Console(name, host, port_rx=port_rx, transport=transport, user=user, **options))
+    except (ValueError, OSError) as e:
+        return f"Could not add console '{name}': {e}"
+    return f"Added console '{name}' at {host}."
 
 @mcp.prompt()
 def system_instructions() -> str:
@@ -694,8 +4580,10 @@ def system_instructions() -> str:
         "You are controlling an ETC Eos lighting console via OSC.\n"
         "The current state of the console (cues, faders, etc.) is NOT automatically known.\n"
         "You MUST call the `sync_state` tool immediately upon starting to populate the state.\n"
-        "Wait for the confirmation message before querying for specific status.\n"
+        "It waits for the console's replies and reports any that did not arrive.\n"
     )
 
+metrics.mark_startup("imported")
+
 if __name__ == "__main__":
     mcp.run()